@@ -0,0 +1,136 @@
+#Headless Monte Carlo benchmark of the localizer, sweeping rooms, microphone grids, signal positions and noise levels
+#Run with: python benchmark.py --grids 3x3 6x6 10x10 --noise 0 0.01 --output results.json
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import instrumentation
+import pipeline
+from cameraController import LOCALIZATION_MODES
+
+#Build a room, microphone grid, DSP and camera controller for one benchmark configuration, with every microphone on one DSP
+#Returns None when the microphone grid does not fit inside the room
+def buildScenario(roomDimensions, micGrid, gridOffset, microphoneSensitivity, mode):
+    return pipeline.setupScenario(roomDimensions, microphoneSensitivity, micGrid, gridOffset, roomDimensions[2],
+                                  [0, 0, roomDimensions[2]/2], mode, numPorts=micGrid[0]*micGrid[1])
+
+#Draw random signal positions inside the room, below the microphone grid
+def generateSignalPositions(roomDimensions, count, rng):
+    low = np.array([0.1, 0.1, 0.1])
+    high = np.array([roomDimensions[0] - 0.1, roomDimensions[1] - 0.1, roomDimensions[2] - 0.5])
+    return rng.uniform(low, high, size=(count, 3))
+
+#Time every fix of one configuration and summarize throughput, latency, peak memory and localization error
+def runConfiguration(roomDimensions, micGrid, gridOffset, noise, mode, signalCount, signalStrength, microphoneSensitivity, rng):
+    #Peak memory covers building the layout geometry plus a single fix
+    tracemalloc.start()
+    scenario = buildScenario(roomDimensions, micGrid, gridOffset, microphoneSensitivity, mode)
+    if scenario is None:
+        tracemalloc.stop()
+        return None
+    microphoneBank, cameraController = scenario
+    microphoneBank.sendSignal([roomDimensions[0]/2, roomDimensions[1]/2, roomDimensions[2]/2], signalStrength)
+    cameraController.getSignalPosition(signalStrength)
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies = []
+    errors = []
+    failures = 0
+    instrumentation.reset()
+    for signalPosition in generateSignalPositions(roomDimensions, signalCount, rng):
+        microphoneBank.sendSignal(signalPosition, signalStrength)
+        if noise:
+            microphoneBank.volumes *= np.maximum(1 + noise*rng.standard_normal(len(microphoneBank)), 1e-3)
+
+        start = time.perf_counter()
+        predictedSignalLocation = cameraController.getSignalPosition(signalStrength)
+        latencies.append(time.perf_counter() - start)
+
+        if predictedSignalLocation:
+            errors.append(float(np.linalg.norm(np.asarray(predictedSignalLocation) - signalPosition)))
+        else:
+            failures += 1
+
+    latencies = np.array(latencies)
+    result = {
+        "room": list(roomDimensions),
+        "grid": list(micGrid),
+        "spacing": gridOffset,
+        "microphones": micGrid[0]*micGrid[1],
+        "triples": len(cameraController.getLayout().triples),
+        "noise": noise,
+        "mode": mode,
+        "fixes": signalCount,
+        "fixesPerSecond": float(signalCount/latencies.sum()),
+        "latencyMs": instrumentation.summarizeSamples(latencies, (50, 90, 99), 1000),
+        "peakMemoryBytes": peakMemory,
+        "failureRate": failures/signalCount,
+        "errorMeters": instrumentation.summarizeSamples(errors, (50, 90))
+    }
+    if instrumentation.enabled:
+        result["stages"] = instrumentation.getStats()
+    return result
+
+#Identify the code and environment a set of results came from, so runs can be compared across versions
+def getRunMetadata(arguments):
+    revision = None
+    try:
+        revision = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "arguments": vars(arguments)
+    }
+
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Benchmark localization throughput, latency, memory and accuracy.")
+    parser.add_argument("--rooms", nargs="+", type=pipeline.parseDimensions, default=[[10, 10, 5]], help="room dimensions as x,y,z")
+    parser.add_argument("--grids", nargs="+", type=pipeline.parseGrid, default=[[3, 3], [6, 6], [10, 10]], help="microphone grids as XxY")
+    parser.add_argument("--spacings", nargs="+", type=float, default=[1.0], help="microphone grid spacings")
+    parser.add_argument("--noise", nargs="+", type=float, default=[0.0, 0.01], help="relative volume noise levels")
+    parser.add_argument("--modes", nargs="+", choices=LOCALIZATION_MODES, default=LOCALIZATION_MODES, help="localization modes")
+    parser.add_argument("--signals", type=int, default=100, help="random signal positions per configuration")
+    parser.add_argument("--strength", type=float, default=3.0, help="signal strength")
+    parser.add_argument("--sensitivity", type=float, default=10.0, help="microphone sensitivity")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", default="benchmark_results.json", help="path of the JSON results file")
+    parser.add_argument("--profile", action="store_true", help="record the time spent in each pipeline stage with every result")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    arguments = parseArguments()
+    if arguments.profile:
+        instrumentation.enable()
+    rng = np.random.default_rng(arguments.seed)
+
+    results = []
+    for roomDimensions in arguments.rooms:
+        for micGrid in arguments.grids:
+            for gridOffset in arguments.spacings:
+                for noise in arguments.noise:
+                    for mode in arguments.modes:
+                        result = runConfiguration(roomDimensions, micGrid, gridOffset, noise, mode, arguments.signals,
+                                                  arguments.strength, arguments.sensitivity, rng)
+                        if result is None:
+                            print("-> Skipping {0}x{1} grid with spacing {2}, it does not fit in room {3}".format(micGrid[0], micGrid[1], gridOffset, roomDimensions))
+                            continue
+                        results.append(result)
+                        error = result["errorMeters"]["p50"] if result["errorMeters"] else float("nan")
+                        print("-> room {0} grid {1}x{2} spacing {3} noise {4} {5}: {6:.1f} fixes/s, p50 {7:.2f} ms, p99 {8:.2f} ms, peak {9:.1f} MB, median error {10:.3f} m, failures {11:.0%}"
+                              .format(roomDimensions, micGrid[0], micGrid[1], gridOffset, noise, mode, result["fixesPerSecond"],
+                                      result["latencyMs"]["p50"], result["latencyMs"]["p99"], result["peakMemoryBytes"]/1e6,
+                                      error, result["failureRate"]))
+
+    with open(arguments.output, "w") as outputFile:
+        json.dump({"metadata": getRunMetadata(arguments), "results": results}, outputFile, indent=2)
+    print("-> Wrote {0} results to {1}".format(len(results), arguments.output))
@@ -0,0 +1,55 @@
+import numpy as np
+
+#Version number stored in calibration files, bumped whenever the stored fields change
+CALIBRATION_VERSION = 1
+
+#Class to represent a fitted calibration profile, the effective sensitivity of each microphone and its gain over the nominal sensitivity
+class CalibrationProfile:
+    def __init__(self, micPositions, sensitivities, nominalSensitivity):
+        self.micPositions = np.asarray(micPositions, dtype=float).reshape(-1, 3)
+        self.sensitivities = np.asarray(sensitivities, dtype=float)
+        self.nominalSensitivity = float(nominalSensitivity)
+        self.gains = self.sensitivities/self.nominalSensitivity
+
+    #Write the profile to a compact uncompressed .npz file that loads without any parsing
+    def save(self, path):
+        np.savez(path, version=CALIBRATION_VERSION, micPositions=self.micPositions, sensitivities=self.sensitivities,
+                 nominalSensitivity=self.nominalSensitivity)
+
+    #Read a profile written by save
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != CALIBRATION_VERSION:
+                raise ValueError("Unsupported calibration file version {0} in {1}".format(int(data["version"]), path))
+            return cls(data["micPositions"], data["sensitivities"], data["nominalSensitivity"])
+
+    #Check whether this profile was fitted for the given microphone positions
+    def matches(self, micPositions):
+        positions = np.asarray(micPositions, dtype=float).reshape(-1, 3)
+        return positions.shape == self.micPositions.shape and np.allclose(positions, self.micPositions)
+
+#Record the DSP volumes for a set of reference emissions, sendSignal(position, strength) plays each one into the room
+#Returns an (R,N) array with one row of microphone volumes per reference emission
+def recordReferenceEmissions(dsp, sendSignal, referencePositions, referenceStrengths):
+    referenceVolumes = []
+    for position, strength in zip(referencePositions, referenceStrengths):
+        sendSignal(position, strength)
+        referenceVolumes.append(np.array(dsp.pollSignals(), dtype=float))
+    return np.array(referenceVolumes)
+
+#Fit the effective sensitivity of every microphone from reference emissions of known strength at known positions
+#Each microphone should register sensitivity * strength / distance, so its sensitivity is the least-squares slope of the
+#registered volumes against strength / distance over all of the references
+def fitCalibration(micPositions, referencePositions, referenceStrengths, referenceVolumes, nominalSensitivity):
+    micPositions = np.asarray(micPositions, dtype=float).reshape(-1, 3)
+    referencePositions = np.asarray(referencePositions, dtype=float).reshape(-1, 3)
+    referenceStrengths = np.asarray(referenceStrengths, dtype=float)
+    referenceVolumes = np.asarray(referenceVolumes, dtype=float)[:, 0:len(micPositions)]
+
+    offsets = referencePositions[:, None, :] - micPositions[None, :, :]
+    distances = np.sqrt((offsets*offsets).sum(axis=2))
+    expected = referenceStrengths[:, None]/np.maximum(distances, 1e-9)
+
+    sensitivities = (referenceVolumes*expected).sum(axis=0)/(expected*expected).sum(axis=0)
+    return CalibrationProfile(micPositions, sensitivities, nominalSensitivity)
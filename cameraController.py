@@ -1,8 +1,34 @@
+import logging
 import math
+import time
 
 import numpy as np
 import helpers
-from itertools import combinations
+import instrumentation
+from micLayout import MicLayout, DEFAULT_MAX_TRIPLES
+from multiSource import SourceDictionary, DEFAULT_GRID_SPACING
+from gridSearch import AttenuationTable, DEFAULT_VOXEL_SIZE, MIN_GRID_MICS
+from tracker import SignalTracker, DEFAULT_TRACKING_MICS, DEFAULT_FRAME_INTERVAL
+import robust
+from steering import CameraRig, DEFAULT_MAX_PAN_RATE, DEFAULT_MAX_TILT_RATE, DEFAULT_DEADBAND
+
+logger = logging.getLogger(__name__)
+
+#Timers for the stages of a fix, see instrumentation
+fixTimer = instrumentation.getTimer("fix")
+distanceTimer = instrumentation.getTimer("distances")
+trilaterationTimer = instrumentation.getTimer("trilateration")
+rejectionTimer = instrumentation.getTimer("rejection")
+averagingTimer = instrumentation.getTimer("averaging")
+multilaterationTimer = instrumentation.getTimer("multilateration")
+jointSolveTimer = instrumentation.getTimer("jointSolve")
+gridSearchTimer = instrumentation.getTimer("gridSearch")
+trackingTimer = instrumentation.getTimer("tracking")
+robustTimer = instrumentation.getTimer("robust")
+cameraTimer = instrumentation.getTimer("repositionCamera")
+
+#Available strategies for turning microphone spheres into a signal position
+LOCALIZATION_MODES = ["triples", "multilateration", "grid", "tracking", "robust"]
 
 #Class to represent an embedded camera controller object
 class CameraController:
@@ -11,136 +37,447 @@ class CameraController:
         self.orientation = orientation
         self.dsp = dsp
         self.micPositions = []
+        self.layout = None
+        self.maxTriples = DEFAULT_MAX_TRIPLES
+        self.sourceDictionary = None
+        self.attenuationTable = None
+        self.voxelSize = DEFAULT_VOXEL_SIZE
+        self.tableCacheDirectory = None
+        self.tracker = None
+        self.ransacSamples = robust.DEFAULT_RANSAC_SAMPLES
+        self.inlierTolerance = robust.DEFAULT_INLIER_TOLERANCE
+        self.rejectedMics = []
+        self.rig = None
+        self.lastSteerTime = None
         self.micSensitivity = 0
+        self.calibration = None
+        self.signalStrength = None
         self.room = room
+        self.localizationMode = "triples"
+        self.gaussNewtonIterations = 0
+        self.residual = None
 
     #Set microphone sensitivity, this should align with the sensitivities of the microphones in the dsp
     def setMicSensitivity(self, sensitivity):
         self.micSensitivity = sensitivity
+        self.sourceDictionary = None
 
     #Inform the controller of the positions of microphones in the room
+    #Microphones are fixed once placed, so the layout geometry is precomputed here rather than on every localization
     def setMicPositions(self, micPositions):
         self.micPositions = micPositions
+        self.layout = None
+        self.sourceDictionary = None
+        self.attenuationTable = None
+        if self.tracker is not None:
+            self.tracker.reset()
+
+        #A calibration profile belongs to the microphones it was fitted for
+        if self.calibration is not None and not self.calibration.matches(micPositions):
+            logger.warning("Calibration profile was fitted for a different microphone layout, dropping it.")
+            self.calibration = None
+        self.layout = self.getLayout()
+
+    #Use a fitted calibration profile, replacing the shared sensitivity with each microphone's measured sensitivity
+    def setCalibration(self, calibration):
+        if len(self.micPositions) and not calibration.matches(self.micPositions):
+            logger.warning("Calibration profile was fitted for a different microphone layout, ignoring it.")
+            return
+        self.calibration = calibration
+        self.sourceDictionary = None
+
+    #Return the sensitivity of each active microphone, from the calibration profile when one is set
+    def getSensitivities(self):
+        if self.calibration is not None:
+            return self.calibration.sensitivities[0:self.dsp.getNumActiveMics()]
+        return self.micSensitivity
 
     #Retrieve mic positions array
     def getMicPositions(self):
         return self.micPositions
 
+    #Limit trilateration to the best conditioned maxTriples microphone triples (None keeps every non-collinear triple)
+    def setMaxTriples(self, maxTriples):
+        self.maxTriples = maxTriples
+        self.layout = None
+
+    #Return the precomputed geometry for the active microphones, rebuilding it if the positions or active microphone count changed
+    def getLayout(self):
+        activeMicCount = min(self.dsp.getNumActiveMics(), len(self.micPositions))
+        if self.layout is None or self.layout.count != activeMicCount:
+            self.layout = MicLayout(self.micPositions[0:activeMicCount], self.maxTriples)
+        return self.layout
+
+    #Select how signals are localized, "triples" averages every three sphere intersection, "multilateration" solves all spheres at once
+    #"grid" searches a precomputed attenuation table over the room, "tracking" follows a moving signal from the previous fix
+    #and "robust" finds the position most microphones agree on, ignoring faulty ones
+    #gaussNewtonIterations refines the multilateration estimate with that many Gauss-Newton steps
+    def setLocalizationMode(self, mode, gaussNewtonIterations=0):
+        if mode not in LOCALIZATION_MODES:
+            logger.error("Unknown localization mode {0}, expected one of {1}.".format(mode, LOCALIZATION_MODES))
+            return
+        self.localizationMode = mode
+        self.gaussNewtonIterations = gaussNewtonIterations
+
+    #Configure the grid search voxel size, and a directory to cache attenuation tables in so they are only built once per layout
+    def setGridSearch(self, voxelSize=DEFAULT_VOXEL_SIZE, cacheDirectory=None):
+        self.voxelSize = voxelSize
+        self.tableCacheDirectory = cacheDirectory
+        self.attenuationTable = None
+
+    #Return the attenuation table for the active microphones, building it or loading it from the cache when the layout changed
+    def getAttenuationTable(self):
+        layout = self.getLayout()
+        table = self.attenuationTable
+        if table is None or not layout.matches(table.micPositions):
+            table = AttenuationTable(layout.positions, self.room, self.voxelSize, self.tableCacheDirectory)
+            self.attenuationTable = table
+        return table
+
+    #Configure tracking mode, see SignalTracker for the options
+    def setTracking(self, numMics=DEFAULT_TRACKING_MICS, useKalman=True, processNoise=1.0, measurementNoise=0.05, frameInterval=DEFAULT_FRAME_INTERVAL):
+        self.tracker = SignalTracker(self, numMics, useKalman, processNoise, measurementNoise, frameInterval)
+
+    #Rate limit the camera, so rePositionCamera slews towards each fix at no more than the given rates in degrees per second
+    #and leaves the camera where it is for changes inside the deadband, see CameraRig
+    #Passing None turns the limits off again and every fix points the camera straight at the signal
+    def setSteering(self, maxPanRate=DEFAULT_MAX_PAN_RATE, maxTiltRate=DEFAULT_MAX_TILT_RATE, deadband=DEFAULT_DEADBAND):
+        self.lastSteerTime = None
+        if maxPanRate is None:
+            self.rig = None
+            return
+        self.rig = CameraRig.fromController(self, maxPanRate, maxTiltRate, deadband)
+
+    #Return the signal tracker used in tracking mode, creating one with the default settings if needed
+    def getTracker(self):
+        if self.tracker is None:
+            self.tracker = SignalTracker(self)
+        return self.tracker
+
+    #Configure robust mode, the number of microphone triples sampled per fix and the fraction of a sphere's radius it may miss by
+    def setRansac(self, samples=robust.DEFAULT_RANSAC_SAMPLES, inlierTolerance=robust.DEFAULT_INLIER_TOLERANCE):
+        self.ransacSamples = samples
+        self.inlierTolerance = inlierTolerance
+
+    #Return the indices of the microphones robust mode left out of the last fix
+    def getRejectedMics(self):
+        return self.rejectedMics
+
+    #Return the root mean square sphere residual of the last predicted signal position
+    def getResidual(self):
+        return self.residual
+
+    #Return the signal strength used for the last predicted signal position, solved for when it was not supplied
+    def getSignalStrength(self):
+        return self.signalStrength
+
+    #Check the controller knows enough about the microphones to localize
+    def checkMicConfiguration(self):
+        if self.calibration is None and not self.micSensitivity:
+            logger.error("Microphone sensitivity not set, please set sensitivity before trying to localize.")
+            return False
+        if len(self.micPositions) < self.dsp.getNumActiveMics():
+            logger.error("Please make sure you have location data for all microphones in the system, got {0} positions and {1} active microphones.".format(len(self.micPositions), self.dsp.getNumActiveMics()))
+            return False
+        return True
+
     #Poll DSP signals from the microphones
     def getSignalsFromDSP(self):
         return self.dsp.pollSignals()
 
-    #Predict the strength of the signal in the room (work in progress, requires calibration step)
-    def predictSignalStrength(self, signalArray):
-        predictedVolume = (sum(signalArray) / len(signalArray)) / self.micSensitivity #*avgPredictedDistance
-        return predictedVolume
-
-    #Generate radius of signal from microphones in the room
-    def getSignalDistances(self, actualVolume):
-        micPositions = self.micPositions
-        micSensitivity = self.micSensitivity
-        signalArray = self.getSignalsFromDSP()
-
-        if not micSensitivity:
-            print("Microphone sensitivity not set, please set sensitivity before trying to localize.")
+    #Predict the strength of the signal in the room by solving for it jointly with the signal position
+    #This leaves the controller as it was, the last fix, residual and any track are not touched
+    #Returns None when the strength cannot be solved for
+    def predictSignalStrength(self, signalArray=None):
+        distanceRatios = self.getDistanceRatios(signalArray)
+        if distanceRatios is None:
+            return None
+        layout = self.getLayout()
+        solution = self.getJointSolution(layout.positions, distanceRatios[0:layout.count])
+        if solution is None:
+            return None
+        return solution[1]
+
+    #Distance from each microphone to the signal per unit of signal strength, polling the DSP unless a frame of volumes is supplied
+    def getDistanceRatios(self, signalArray=None):
+        micSensitivity = self.getSensitivities()
+        if signalArray is None:
+            signalArray = self.getSignalsFromDSP()
+
+        if not self.checkMicConfiguration():
             return
-        if len(micPositions) < self.dsp.getNumActiveMics():
-            print("Please make sure you have location data for all microphones in the system, got {0} positions and {1} active microphones.".format(len(micPositions), self.dsp.getNumActiveMics()))
-            return
-
-        predictedVolume = self.predictSignalStrength(signalArray)
-        predictedVolume = actualVolume
-        distanceArray = []
-
-        for x in range(0, len(signalArray)):
-            if signalArray[x] <= 0:
-                print("Error with signal from microphone {0}, expected a positive, non-zero reading and got: {1}".format(x, signalArray[x]))
-                return
-            distanceToMic = (predictedVolume/signalArray[x])*micSensitivity
-            distanceArray.append(distanceToMic)
 
-        return distanceArray
+        signalArray = np.asarray(signalArray, dtype=float)[0:self.dsp.getNumActiveMics()]
 
-    #Predict the position of an audio signal in the room
-    def getSignalPosition(self, actualVolume):
-        micPositions = self.micPositions
-        distanceArray = self.getSignalDistances(actualVolume)
-        activeMicCount = self.dsp.getNumActiveMics()
+        invalidReadings = np.flatnonzero(signalArray <= 0)
+        if len(invalidReadings):
+            x = invalidReadings[0]
+            instrumentation.count("invalidReadings", len(invalidReadings))
+            logger.error("Error with signal from microphone {0}, expected a positive, non-zero reading and got: {1}".format(x, signalArray[x]))
+            return
 
-        microphoneSphereStats = []
+        return micSensitivity/signalArray
 
-        #Generate sphere data from the microphones possible pickup pattern
-        for x in range(0, activeMicCount):
-            radius = float(distanceArray[x])
-            offSetX = float(micPositions[x][0])
-            offSetY = float(micPositions[x][1])
-            offSetZ = float(micPositions[x][2])
+    #Generate radius of signal from microphones in the room, polling the DSP unless a frame of volumes is supplied
+    def getSignalDistances(self, actualVolume, signalArray=None):
+        distanceRatios = self.getDistanceRatios(signalArray)
+        if distanceRatios is None:
+            return
 
-            microphoneSphereStats.append([np.array([offSetX, offSetY, offSetZ]), radius])
+        distanceArray = actualVolume*distanceRatios
 
-            for y in range(x+1, activeMicCount):
-                separationDistance = helpers.get3DDistance(micPositions[x], micPositions[y])
+        return distanceArray
 
-        #Find all non-repeating permutations of 3 microphone pickup spheres in the room
-        spherePerms = combinations(microphoneSphereStats, 3)
+    #Predict the position of an audio signal in the room, from a supplied frame of volumes or a fresh DSP poll
+    #When actualVolume is None the signal strength is unknown and is solved for together with the position
+    #timestamp is the time the frame was captured in seconds, tracking mode uses it to advance the track by the real frame interval
+    def getSignalPosition(self, actualVolume, signalArray=None, timestamp=None):
+        self.rejectedMics = []
+        with fixTimer:
+            if self.localizationMode == "tracking":
+                with trackingTimer:
+                    predictedSignalLocation = self.getTracker().update(actualVolume, signalArray, timestamp)
+            else:
+                predictedSignalLocation = self.solveSignalPosition(actualVolume, signalArray)
+        instrumentation.count("fixes" if predictedSignalLocation else "failedFixes")
+        return predictedSignalLocation
 
-        #Calculate all mathematically relevant sphere trilaterations for the mircophone permutations
-        intersectionList = []
-        for x in spherePerms:
-            try:
-                intersection = helpers.trilaterate(x[0][0], x[1][0], x[2][0], x[0][1], x[1][1], x[2][1])
-            except:
-                continue
-            if not np.isnan(intersection[0][0]) and not np.isnan(intersection[1][0]):
-                intersectionList.append(intersection)
+    #Solve for the position of an audio signal from scratch, with nothing carried over from earlier frames
+    #Tracking mode uses this to start or recover a track, with the triples solver
+    def solveSignalPosition(self, actualVolume, signalArray=None):
+        self.residual = None
+        self.rejectedMics = []
+        self.signalStrength = actualVolume
+        if signalArray is None:
+            signalArray = self.getSignalsFromDSP()
+        if self.localizationMode == "grid":
+            with gridSearchTimer:
+                return self.gridSearchPosition(actualVolume, signalArray)
+        if self.localizationMode == "robust":
+            with robustTimer:
+                return self.robustPosition(actualVolume, signalArray)
+        if actualVolume is None:
+            with jointSolveTimer:
+                return self.solvePositionAndStrength(signalArray)
+
+        with distanceTimer:
+            distanceArray = self.getSignalDistances(actualVolume, signalArray)
+        layout = self.getLayout()
+        if distanceArray is None:
+            return []
+
+        #Generate sphere data from the microphones possible pickup pattern, the centers and their geometry come from the cached layout
+        sphereCenters = layout.positions
+        sphereRadii = distanceArray[0:layout.count]
+
+        if self.localizationMode == "multilateration":
+            with multilaterationTimer:
+                return self.multilateratePosition(sphereCenters, sphereRadii)
+
+        #Calculate the sphere trilaterations for the layout's well-conditioned microphone triples in a single pass
+        with trilaterationTimer:
+            lowerPoints, upperPoints, valid = helpers.trilaterateBatch(sphereCenters, sphereRadii, basis=layout.trilaterationBasis)
+        if not valid.any():
+            logger.warning("No three microphone pickup spheres intersect, unable to localize signal.")
+            return []
+
+        #Drop the triples whose spheres do not meet, then sort the predicted intersections by z value
+        with rejectionTimer:
+            instrumentation.count("rejectedTriples", len(valid) - int(valid.sum()))
+            lowerPoints, upperPoints = sortPointArrays(lowerPoints[valid], upperPoints[valid])
 
-        #Sort the predicted intersections by z value
-        intersectionList = sortPoints(intersectionList)
+        #Average all estimated upper and lower points to find center of signal prediction
+        with averagingTimer:
+            lowerPoint = lowerPoints.mean(axis=0)
+            upperPoint = upperPoints.mean(axis=0)
 
-        lowerPoint = [0, 0, 0]
-        upperPoint = [0, 0, 0]
+            #Determine which of the predicted signal locations is within the bounds of the room (this could theoretically flip if the microphone array was on the floor)
+            predictedSignalLocation = inRoom([lowerPoint, upperPoint], self.room)
+        if predictedSignalLocation:
+            self.residual = helpers.getSphereResidual(sphereCenters, sphereRadii, predictedSignalLocation)
 
-        #Average all estimated upper and lower points to find center of signal prediction
-        for x in intersectionList:
-            for y in range(0, 3):
-                lowerPoint[y] += x[0][y]
-                upperPoint[y] += x[1][y]
-        for y in range(0, 3):
-            lowerPoint[y] = lowerPoint[y]/len(intersectionList)
-            upperPoint[y] = upperPoint[y]/len(intersectionList)
+        return predictedSignalLocation
 
-        #Determine which of the predicted signal locations is within the bounds of the room (this could theoretically flip if the microphone array was on the floor)
-        predictedSignalLocation = inRoom([lowerPoint, upperPoint], self.room)
+    #Predict the position of an audio signal by solving all microphone spheres together instead of averaging triples
+    def multilateratePosition(self, sphereCenters, sphereRadii):
+        candidates = helpers.multilaterate(sphereCenters, sphereRadii, self.getLayout().multilaterationSystem)
+        if not candidates:
+            logger.warning("Microphone layout is degenerate (fewer than three non-collinear microphones), unable to localize signal.")
+            return []
+
+        #Refine each candidate and keep the one inside the room, as with the upper and lower trilateration points
+        predictedSignalLocation = []
+        for candidate in candidates:
+            point, residual = helpers.refineMultilateration(sphereCenters, sphereRadii, candidate, self.gaussNewtonIterations)
+            if inRoom([point], self.room):
+                predictedSignalLocation = inRoom([point], self.room)
+                self.residual = residual
 
         return predictedSignalLocation
 
+    #Calculate the camera heading in degrees that points at the predicted signal location
+    def getCameraHeading(self, predictedSignalLocation):
+        pan, tilt = helpers.getPanTilt(self.position, predictedSignalLocation)
+        return [float(pan), float(tilt)]
+
+    #Predict the positions of up to numSources simultaneous signals, from a supplied frame of volumes or a fresh DSP poll
+    #Returns [position, strength, confidence] for each source found, most confident first
+    def getSignalPositions(self, numSources, gridSpacing=DEFAULT_GRID_SPACING, signalArray=None):
+        if self.calibration is None and not self.micSensitivity:
+            logger.error("Microphone sensitivity not set, please set sensitivity before trying to localize.")
+            return []
+        if signalArray is None:
+            signalArray = self.getSignalsFromDSP()
+        layout = self.getLayout()
+
+        #The candidate dictionary only depends on the layout, room and grid spacing, so it is kept between calls
+        dictionary = self.sourceDictionary
+        if dictionary is None or dictionary.gridSpacing != gridSpacing or not layout.matches(dictionary.micPositions):
+            dictionary = SourceDictionary(layout.positions, self.getSensitivities(), self.room, gridSpacing)
+            self.sourceDictionary = dictionary
+
+        return dictionary.localize(np.asarray(signalArray, dtype=float)[0:layout.count], numSources)
+
+    #Predict the position of an audio signal by scoring every voxel of the room against the microphone volumes
+    #Unlike sphere intersection this always returns the best fitting position, noisy readings only make it less precise
+    #The residual reported for this mode is in normalized volume (volume / sensitivity) rather than distance
+    def gridSearchPosition(self, actualVolume, signalArray=None):
+        if signalArray is None:
+            signalArray = self.getSignalsFromDSP()
+        if not self.checkMicConfiguration():
+            return []
+        layout = self.getLayout()
+        if layout.count < MIN_GRID_MICS or not len(layout.triples):
+            logger.warning("Grid search needs at least {0} microphones that are not all in a line, unable to localize signal.".format(MIN_GRID_MICS))
+            return []
+
+        table = self.getAttenuationTable()
+        normalizedVolumes = np.asarray(signalArray, dtype=float)[0:len(table.micPositions)]/self.getSensitivities()
+        position, strength, residual = table.localize(normalizedVolumes, actualVolume)
+        self.signalStrength = strength
+        self.residual = residual
+        return inRoom([position], self.room)
+
+    #Predict the position of an audio signal from the microphones that agree with each other, rather than failing the fix or
+    #averaging in a faulty microphone, the microphones left out are available from getRejectedMics
+    #When actualVolume is None the strength is first estimated from samples of the positive readings, see
+    #robust.sampleJointSolution, then solved again on the microphones that agree at that strength
+    def robustPosition(self, actualVolume, signalArray=None):
+        self.rejectedMics = []
+        if signalArray is None:
+            signalArray = self.getSignalsFromDSP()
+        if not self.checkMicConfiguration():
+            return []
+
+        #Non-positive readings get no sphere and are rejected along with the spheres that disagree
+        layout = self.getLayout()
+        signalArray = np.asarray(signalArray, dtype=float)[0:layout.count]
+        usable = signalArray > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            distanceRatios = np.where(usable, self.getSensitivities()/signalArray, np.nan)
+
+        signalStrength = actualVolume
+        if signalStrength is None:
+            solution = robust.sampleJointSolution(layout.positions[usable], distanceRatios[usable], self.room, inlierTolerance=self.inlierTolerance)
+            if solution is None:
+                self.rejectedMics = list(range(0, layout.count))
+                logger.warning("Unable to solve for the signal strength from the microphones with positive readings.")
+                return []
+            signalStrength = solution[1]
+
+        consensus = robust.ransacLocalize(layout, signalStrength*distanceRatios, self.room, self.ransacSamples, self.inlierTolerance)
+        if consensus is None:
+            self.rejectedMics = list(range(0, layout.count))
+            logger.warning("Too few microphones agree on a signal position, unable to localize signal.")
+            return []
+
+        point, inliers, residual = consensus
+        if actualVolume is None:
+            #With the strength unknown too, a handful of spheres can always be made to agree, so the consensus has to outnumber
+            #both the unknowns and the microphones it leaves out, and the position and strength are solved again on it alone
+            solution = None
+            if inliers.sum() >= max(robust.MIN_JOINT_INLIERS, int(usable.sum())//2 + 1):
+                solution = self.getJointSolution(layout.positions[inliers], distanceRatios[inliers], verbose=False)
+            if solution is None:
+                self.rejectedMics = list(range(0, layout.count))
+                logger.warning("Too few microphones agree on a signal position and strength, unable to localize signal.")
+                return []
+            point, signalStrength, residual = solution
+        self.rejectedMics = [int(index) for index in np.flatnonzero(~inliers)]
+        instrumentation.count("rejectedMics", len(self.rejectedMics))
+        self.signalStrength = signalStrength
+        self.residual = residual
+        return inRoom([point], self.room)
+
+    #Predict the position of an audio signal of unknown strength by solving for both at once
+    def solvePositionAndStrength(self, signalArray=None):
+        distanceRatios = self.getDistanceRatios(signalArray)
+        layout = self.getLayout()
+        if distanceRatios is None:
+            return []
+
+        solution = self.getJointSolution(layout.positions, distanceRatios[0:layout.count])
+        if solution is None:
+            return []
+
+        point, self.signalStrength, self.residual = solution
+        return inRoom([point], self.room)
+
+    #Solve for the position and strength of a signal from microphone distance ratios, keeping the solution inside the room
+    #as with the upper and lower trilateration points
+    #Returns the point, strength and root mean square residual, or None when there is no solution inside the room
+    def getJointSolution(self, sphereCenters, distanceRatios, verbose=True):
+        solutions = helpers.solvePositionAndStrength(sphereCenters, distanceRatios)
+        if not solutions:
+            if verbose:
+                logger.warning("At least five microphones in general position are needed to solve for an unknown signal strength.")
+            return None
+
+        inRoomSolution = None
+        for point, strength, residual in solutions:
+            if inRoom([point], self.room):
+                inRoomSolution = (point, strength, residual)
+        return inRoomSolution
+
     #Determine the necessary angle offsets to point camera towards the signal
-    def rePositionCamera(self, predictedSignalLocation):
+    #With steering set the camera only moves as far as its rates allow in elapsed seconds, which defaults to the time since
+    #the last reposition
+    def rePositionCamera(self, predictedSignalLocation, verbose=True, elapsed=None):
         currOrientation = self.orientation
-        cameraPosition = self.position
+        with cameraTimer:
+            if self.rig is None:
+                signalDegrees = self.getCameraHeading(predictedSignalLocation)
+            else:
+                signalDegrees = self.steerCamera(predictedSignalLocation, elapsed)
 
-        signalUnitVector = helpers.getUnitVector(predictedSignalLocation, cameraPosition)
-        signalDegrees = helpers.getDegreeHeading(signalUnitVector)
-
-        print("->>> Redirecting camera from orientation alpha: {0}, beta: {1}, to orientation alpha: {2}, beta: {3}"
-              .format(round(currOrientation[0], 2), round(currOrientation[1], 2), round(signalDegrees[0], 2), round(signalDegrees[1], 2)))
+        if verbose:
+            logger.info("->>> Redirecting camera from orientation alpha: {0}, beta: {1}, to orientation alpha: {2}, beta: {3}"
+                  .format(round(currOrientation[0], 2), round(currOrientation[1], 2), round(signalDegrees[0], 2), round(signalDegrees[1], 2)))
 
         self.orientation = signalDegrees
 
-#Sort intersection points in the intersection vector list by their y values
-def sortPoints(intersectionList):
-    for x in range(0, len(intersectionList)):
-        if intersectionList[x][0][2] > intersectionList[x][1][2]:
-            intersectionList[x] = (intersectionList[x][1], intersectionList[x][0])
-    return intersectionList
+    #Slew the camera towards the signal under the steering limits and return its new orientation
+    def steerCamera(self, predictedSignalLocation, elapsed=None):
+        now = time.perf_counter()
+        if elapsed is None:
+            elapsed = math.inf if self.lastSteerTime is None else now - self.lastSteerTime
+        self.lastSteerTime = now
+
+        #Start from the controller's orientation and position, either may have been set directly since the last fix
+        self.rig.positions[0] = self.position
+        self.rig.orientations[0] = self.orientation
+        self.rig.steer([predictedSignalLocation], elapsed)
+        return [float(angle) for angle in self.rig.orientations[0]]
+
+#Sort (M,3) arrays of intersection point pairs so the lower array always holds the point with the smaller z value
+def sortPointArrays(lowerPoints, upperPoints):
+    swap = (lowerPoints[:, 2] > upperPoints[:, 2])[:, None]
+    return np.where(swap, upperPoints, lowerPoints), np.where(swap, lowerPoints, upperPoints)
 
 #Determine which points fall inside of the room (one intersection should be above the ceiling)
 def inRoom(points, room):
     point = []
     for x in points:
         if x[0] <= room.x and x[1] <= room.y and x[2] <= room.z:
-            point = [round(x[0], 2), round(x[1], 2), round(x[2], 2)]
+            point = [round(float(x[0]), 2), round(float(x[1]), 2), round(float(x[2]), 2)]
     return point
-
-
-
@@ -0,0 +1,250 @@
+#Asynchronous camera control service: polls the DSP on a fixed cadence, localizes off the event loop and publishes camera headings
+#Run with: python cameraService.py --duration 5 --interval 0.02 to follow a simulated moving signal
+import argparse
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import instrumentation
+import pipeline
+from cameraController import LOCALIZATION_MODES
+
+#Default time between DSP polls in seconds
+DEFAULT_POLL_INTERVAL = 0.05
+
+#Default number of heading updates a subscriber queue holds before the oldest is discarded
+DEFAULT_QUEUE_SIZE = 16
+
+#Number of recent fixes latency statistics are computed over
+LATENCY_WINDOW = 1000
+
+#Class to represent a camera controller run as a service on an asyncio event loop
+#Polling never waits on localization: each poll replaces the pending frame, and a single solve runs in an executor at a time on
+#whichever frame is newest when it starts, so frames that arrive while a solve is running are coalesced rather than queued
+#Signal to heading latency is therefore bounded by one poll interval plus two solve times however slow individual solves get,
+#and fixes whose frame is older than maxFrameAge by the time they finish are dropped rather than moving the camera
+class CameraService:
+    def __init__(self, cameraController, actualVolume, pollInterval=DEFAULT_POLL_INTERVAL, maxFrameAge=None, executor=None):
+        self.cameraController = cameraController
+        self.actualVolume = actualVolume
+        self.pollInterval = pollInterval
+        self.maxFrameAge = maxFrameAge
+
+        #The controller keeps per-solve state, so solves run one at a time on a single worker thread unless an executor is supplied
+        self.executor = executor
+        self.ownsExecutor = executor is None
+
+        self.subscribers = []
+        self.pendingFrame = None
+        self.frameReady = None
+        self.running = False
+        self.sequence = 0
+
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.solveTimes = deque(maxlen=LATENCY_WINDOW)
+        self.polledFrames = 0
+        self.coalescedFrames = 0
+        self.staleFixes = 0
+        self.failedFixes = 0
+
+    #Register for heading updates, returning the asyncio queue they are published to
+    #A subscriber that falls behind loses its oldest updates rather than holding up the service
+    def subscribe(self, maxSize=DEFAULT_QUEUE_SIZE):
+        queue = asyncio.Queue(maxsize=maxSize)
+        self.subscribers.append(queue)
+        return queue
+
+    #Stop publishing heading updates to a subscriber queue
+    def unsubscribe(self, queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    #Run the service until stop is called or, when given, duration seconds have passed
+    async def run(self, duration=None):
+        if self.ownsExecutor:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        self.frameReady = asyncio.Event()
+        self.running = True
+
+        pollTask = asyncio.ensure_future(self.pollLoop())
+        solveTask = asyncio.ensure_future(self.solveLoop())
+        try:
+            if duration is None:
+                await asyncio.gather(pollTask, solveTask)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            self.running = False
+            pollTask.cancel()
+            solveTask.cancel()
+            await asyncio.gather(pollTask, solveTask, return_exceptions=True)
+            if self.ownsExecutor:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+
+    #Ask a running service to stop
+    def stop(self):
+        self.running = False
+        if self.frameReady is not None:
+            self.frameReady.set()
+
+    #Copy a frame out of the DSP every poll interval, replacing any frame the solver has not picked up yet
+    #Polls are scheduled against a fixed clock, so a slow poll does not push back every later one
+    async def pollLoop(self):
+        loop = asyncio.get_running_loop()
+        nextPoll = loop.time()
+        while self.running:
+            frame = np.array(self.cameraController.getSignalsFromDSP(), dtype=float)
+            if self.pendingFrame is not None:
+                self.coalescedFrames += 1
+            self.pendingFrame = (time.perf_counter(), frame)
+            self.polledFrames += 1
+            self.frameReady.set()
+
+            nextPoll += self.pollInterval
+            await asyncio.sleep(max(nextPoll - loop.time(), 0))
+
+    #Localize the newest frame in the executor, then point the camera and publish the heading
+    async def solveLoop(self):
+        loop = asyncio.get_running_loop()
+        while self.running:
+            await self.frameReady.wait()
+            self.frameReady.clear()
+            if self.pendingFrame is None:
+                continue
+            frameTime, frame = self.pendingFrame
+            self.pendingFrame = None
+
+            solveStart = time.perf_counter()
+            predictedSignalLocation = await loop.run_in_executor(self.executor, self.cameraController.getSignalPosition, self.actualVolume, frame, frameTime)
+            solveEnd = time.perf_counter()
+            self.solveTimes.append(solveEnd - solveStart)
+
+            if not predictedSignalLocation:
+                self.failedFixes += 1
+                continue
+            if self.maxFrameAge is not None and solveEnd - frameTime > self.maxFrameAge:
+                self.staleFixes += 1
+                continue
+
+            self.cameraController.rePositionCamera(predictedSignalLocation, verbose=False)
+            latency = time.perf_counter() - frameTime
+            self.latencies.append(latency)
+            self.sequence += 1
+            self.publish({
+                "sequence": self.sequence,
+                "position": predictedSignalLocation,
+                "heading": [float(angle) for angle in self.cameraController.orientation],
+                "frameTime": frameTime,
+                "latency": latency
+            })
+
+    #Hand a heading update to every subscriber, discarding a subscriber's oldest update when its queue is full
+    def publish(self, update):
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+    #Summarize latency and frame accounting over the recent fixes, with times in milliseconds
+    def getStats(self):
+        stats = {
+            "polledFrames": self.polledFrames,
+            "coalescedFrames": self.coalescedFrames,
+            "fixes": self.sequence,
+            "staleFixes": self.staleFixes,
+            "failedFixes": self.failedFixes,
+            "latencyMs": instrumentation.summarizeSamples(self.latencies, scale=1000),
+            "solveMs": instrumentation.summarizeSamples(self.solveTimes, scale=1000)
+        }
+        return stats
+
+#Class to represent a stand-in for live microphones, moving a signal along a path and broadcasting it to a microphone bank
+class SimulatedMicFeed:
+    def __init__(self, microphoneBank, path, signalStrength, noise=0, seed=0):
+        self.microphoneBank = microphoneBank
+        self.path = np.asarray(path, dtype=float).reshape(-1, 3)
+        self.signalStrength = signalStrength
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.step = 0
+
+    #Return where the signal currently is on its path
+    def getPosition(self):
+        return self.path[self.step % len(self.path)]
+
+    #Broadcast the signal from the next position on its path
+    def advance(self):
+        self.step += 1
+        self.microphoneBank.sendSignal(self.getPosition(), self.signalStrength)
+        if self.noise:
+            self.microphoneBank.volumes *= np.maximum(1 + self.noise*self.rng.standard_normal(len(self.microphoneBank)), 1e-3)
+
+    #Advance the signal every interval seconds until cancelled
+    async def run(self, interval):
+        while True:
+            self.advance()
+            await asyncio.sleep(interval)
+
+#Generate a closed loop of signal positions circling the middle of a room
+def generateCircularPath(roomDimensions, steps, height=None):
+    angles = np.linspace(0, 2*np.pi, steps, endpoint=False)
+    radius = min(roomDimensions[0], roomDimensions[1])/4
+    height = roomDimensions[2]/3 if height is None else height
+    return np.column_stack([roomDimensions[0]/2 + radius*np.cos(angles), roomDimensions[1]/2 + radius*np.sin(angles), np.full(steps, height)])
+
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Follow a simulated moving signal with the asynchronous camera service.")
+    parser.add_argument("--room", type=pipeline.parseDimensions, default=[10, 10, 5], help="room dimensions as x,y,z")
+    parser.add_argument("--grid", type=pipeline.parseDimensions, default=[6, 6], help="microphone grid as x,y")
+    parser.add_argument("--spacing", type=float, default=1.0, help="microphone grid spacing")
+    parser.add_argument("--sensitivity", type=float, default=10.0, help="microphone sensitivity")
+    parser.add_argument("--strength", type=float, default=3.0, help="signal strength")
+    parser.add_argument("--noise", type=float, default=0.0, help="relative volume noise level")
+    parser.add_argument("--mode", choices=LOCALIZATION_MODES, default="multilateration", help="localization mode")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL, help="DSP poll interval in seconds")
+    parser.add_argument("--feed-interval", type=float, default=0.01, help="seconds between simulated signal moves")
+    parser.add_argument("--max-age", type=float, help="drop fixes whose frame is older than this many seconds")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds to run for")
+    return parser.parse_args()
+
+async def runDemo(arguments):
+    scenario = pipeline.setupScenario(arguments.room, arguments.sensitivity, arguments.grid, arguments.spacing, arguments.room[2],
+                                      [0, 0, arguments.room[2]/2], arguments.mode)
+    if scenario is None:
+        return
+    microphoneBank, cameraController = scenario
+
+    feed = SimulatedMicFeed(microphoneBank, generateCircularPath(arguments.room, 360), arguments.strength, arguments.noise)
+    feed.advance()
+    service = CameraService(cameraController, arguments.strength, arguments.interval, arguments.max_age)
+    updates = service.subscribe()
+
+    async def printUpdates():
+        while True:
+            update = await updates.get()
+            if update["sequence"] % 20 == 0:
+                print("-> Fix {0}: position {1}, heading {2}, latency {3:.2f} ms".format(update["sequence"], update["position"],
+                                                                                       [round(angle, 2) for angle in update["heading"]],
+                                                                                       update["latency"]*1000))
+
+    feedTask = asyncio.ensure_future(feed.run(arguments.feed_interval))
+    printTask = asyncio.ensure_future(printUpdates())
+    try:
+        await service.run(arguments.duration)
+    finally:
+        feedTask.cancel()
+        printTask.cancel()
+        await asyncio.gather(feedTask, printTask, return_exceptions=True)
+
+    stats = service.getStats()
+    print("-> {0} fixes from {1} polls, {2} frames coalesced, {3} stale and {4} failed fixes"
+          .format(stats["fixes"], stats["polledFrames"], stats["coalescedFrames"], stats["staleFixes"], stats["failedFixes"]))
+    if stats["latencyMs"]:
+        print("-> Latency p50 {0:.2f} ms, p99 {1:.2f} ms, max {2:.2f} ms; solve p50 {3:.2f} ms"
+              .format(stats["latencyMs"]["p50"], stats["latencyMs"]["p99"], stats["latencyMs"]["max"], stats["solveMs"]["p50"]))
+
+if __name__ == '__main__':
+    asyncio.run(runDemo(parseArguments()))
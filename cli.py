@@ -0,0 +1,88 @@
+#Headless command line entry point, runs localization scenarios without importing any GUI or plotting modules
+#Single scenario:  python cli.py --room 10,10,5 --signal 6,6,2
+#Batch of scenarios:  python cli.py --scenarios scenarios.json --output results.jsonl
+#Results are written as one JSON object per line, log messages go to stderr
+import argparse
+import csv
+import json
+import logging
+import sys
+
+import instrumentation
+import pipeline
+from cameraController import LOCALIZATION_MODES
+
+#Read a batch of scenarios from a JSON file (a list, or an object with a "scenarios" list) or a CSV file with a header row
+def loadScenarios(path):
+    with open(path, newline="") as scenarioFile:
+        if path.lower().endswith(".csv"):
+            return list(csv.DictReader(scenarioFile))
+        scenarios = json.load(scenarioFile)
+    if isinstance(scenarios, dict):
+        scenarios = scenarios["scenarios"]
+    return scenarios
+
+#Run one scenario and return its JSON line result
+def runScenario(index, scenario):
+    result = {"id": scenario.get("id", index)}
+    try:
+        scenario = pipeline.normalizeScenario(scenario)
+    except (KeyError, TypeError, ValueError) as error:
+        result.update({"status": "invalid", "message": "could not parse scenario: {0}".format(error)})
+        return result
+    if scenario["mode"] not in LOCALIZATION_MODES:
+        result.update({"status": "invalid", "message": "unknown localization mode {0}".format(scenario["mode"])})
+        return result
+
+    output = pipeline.runScenario(scenario["roomDimensions"], scenario["microphoneSensitivity"], scenario["signalPosition"],
+                                  scenario["signalStrength"], scenario["micGrid"], scenario["gridOffset"], scenario["gridHeight"],
+                                  scenario["cameraPosition"], scenario["mode"])
+    if output is None:
+        result.update({"status": "invalid", "message": "scenario geometry falls outside the room"})
+        return result
+    result.update(output[0])
+    result["status"] = "ok" if result["predicted"] else "failed"
+    return result
+
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Localize signals without the GUI and emit results as JSON lines.")
+    parser.add_argument("--scenarios", help="JSON or CSV file of scenarios to run instead of a single scenario")
+    parser.add_argument("--output", help="write JSON lines to this file instead of stdout")
+    parser.add_argument("--room", dest="roomDimensions", help="room dimensions as x,y,z")
+    parser.add_argument("--sensitivity", dest="microphoneSensitivity", type=float, help="microphone sensitivity")
+    parser.add_argument("--signal", dest="signalPosition", help="signal position as x,y,z")
+    parser.add_argument("--strength", dest="signalStrength", type=float, help="signal strength")
+    parser.add_argument("--grid", dest="micGrid", help="microphone grid dimensions as x,y")
+    parser.add_argument("--offset", dest="gridOffset", type=float, help="microphone grid spacing")
+    parser.add_argument("--height", dest="gridHeight", type=float, help="microphone grid height")
+    parser.add_argument("--camera", dest="cameraPosition", help="camera position as x,y,z")
+    parser.add_argument("--mode", choices=LOCALIZATION_MODES, help="localization mode")
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], help="level of log messages written to stderr")
+    parser.add_argument("--profile", action="store_true", help="log the time spent in each pipeline stage when done")
+    parser.add_argument("--trace", help="write the timing of every pipeline stage call to this file as JSON lines")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    arguments = parseArguments()
+    logging.basicConfig(level=arguments.log_level, format="%(levelname)s %(name)s: %(message)s", stream=sys.stderr)
+    if arguments.profile or arguments.trace:
+        instrumentation.enable(trace=bool(arguments.trace))
+
+    if arguments.scenarios:
+        scenarios = loadScenarios(arguments.scenarios)
+    else:
+        scenarios = [{key: value for key, value in vars(arguments).items() if key in pipeline.SCENARIO_DEFAULTS}]
+
+    outputFile = open(arguments.output, "w") if arguments.output else sys.stdout
+    try:
+        for index, scenario in enumerate(scenarios):
+            outputFile.write(json.dumps(runScenario(index, scenario)) + "\n")
+            outputFile.flush()
+    finally:
+        if outputFile is not sys.stdout:
+            outputFile.close()
+
+    if arguments.profile:
+        print(json.dumps(instrumentation.getStats()), file=sys.stderr)
+    if arguments.trace:
+        instrumentation.dumpTrace(arguments.trace)
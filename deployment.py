@@ -0,0 +1,231 @@
+#Deployment manager serving many rooms from one host: every room's layout stays resident and localization jobs from all rooms
+#share one worker pool, with a queue per room served round robin so a busy room cannot starve the others
+#Rooms are listed in a JSON file, either a list or an object with a "rooms" list, for example
+#  {"rooms": [{"name": "lobby", "roomDimensions": [20, 12, 4], "micGrid": [12, 10], "gridOffset": 1, "gridHeight": 4}]}
+#Run with: python deployment.py rooms.json --frames 1000 to drive every room with simulated signals
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import instrumentation
+import pipeline
+from cameraController import LOCALIZATION_MODES
+
+logger = logging.getLogger(__name__)
+
+#Room fields and their defaults, the shared scenario defaults plus the number of DSP ports
+ROOM_DEFAULTS = dict(pipeline.SCENARIO_DEFAULTS, numPorts=pipeline.DSP_PORTS)
+
+#Default number of frames a room may have waiting before its oldest is dropped
+DEFAULT_ROOM_QUEUE = 8
+
+#Number of recent jobs per room latency statistics are computed over
+LATENCY_WINDOW = 1000
+
+#Read room configurations from a JSON file, filling in defaults and naming unnamed rooms by position
+def loadRooms(path):
+    with open(path) as roomFile:
+        rooms = json.load(roomFile)
+    if isinstance(rooms, dict):
+        rooms = rooms["rooms"]
+
+    configurations = []
+    for index, room in enumerate(rooms):
+        configuration = pipeline.normalizeScenario(room, ROOM_DEFAULTS)
+        configuration["name"] = str(room.get("name", "room{0}".format(index)))
+        configurations.append(configuration)
+    return configurations
+
+#Class to represent one deployed room, its resident microphone bank and camera controller, its job queue and its statistics
+class RoomDeployment:
+    def __init__(self, configuration, maxQueue=DEFAULT_ROOM_QUEUE):
+        self.name = configuration["name"]
+        self.configuration = configuration
+        self.signalStrength = configuration["signalStrength"]
+        self.queue = deque(maxlen=maxQueue)
+        self.busy = False
+
+        if configuration["mode"] not in LOCALIZATION_MODES:
+            raise ValueError("Room {0} has unknown localization mode {1}".format(self.name, configuration["mode"]))
+        scenario = pipeline.setupScenario(configuration["roomDimensions"], configuration["microphoneSensitivity"], configuration["micGrid"],
+                                          configuration["gridOffset"], configuration["gridHeight"], configuration["cameraPosition"],
+                                          configuration["mode"], configuration["numPorts"])
+        if scenario is None:
+            raise ValueError("Room {0} has microphones or a camera outside the room".format(self.name))
+        self.microphoneBank, self.cameraController = scenario
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.busySeconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.lastResult = None
+
+    #Localize one frame and point the camera, runs on a pool worker
+    def runJob(self, signalArray, submitTime):
+        start = time.perf_counter()
+        predictedSignalLocation = self.cameraController.getSignalPosition(self.signalStrength, signalArray, submitTime)
+        heading = None
+        if predictedSignalLocation:
+            self.cameraController.rePositionCamera(predictedSignalLocation, verbose=False)
+            heading = [float(angle) for angle in self.cameraController.orientation]
+        end = time.perf_counter()
+        return {"room": self.name, "position": predictedSignalLocation, "heading": heading, "latency": end - submitTime, "solveSeconds": end - start}
+
+#Class to schedule localization jobs from many rooms over one shared thread pool
+#Each room runs at most one job at a time, so its controller is never used from two threads and its fixes stay in order, and free
+#workers are handed to rooms with waiting frames in round robin order
+#Threads are used rather than processes so every room's precomputed geometry stays resident in one place, the heavy numpy
+#work releases the interpreter lock while it runs
+class DeploymentManager:
+    def __init__(self, configurations, workers=None, maxQueue=DEFAULT_ROOM_QUEUE, onResult=None):
+        self.rooms = {}
+        for configuration in configurations:
+            if configuration["name"] in self.rooms:
+                raise ValueError("Room name {0} is used more than once".format(configuration["name"]))
+            self.rooms[configuration["name"]] = RoomDeployment(configuration, maxQueue)
+        self.roomOrder = list(self.rooms.values())
+        self.nextRoom = 0
+
+        self.workers = workers or min(len(self.roomOrder), 8) or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.inFlight = 0
+        self.lock = threading.Condition()
+        self.onResult = onResult
+        self.startTime = time.perf_counter()
+
+    #Build a manager for every room in a configuration file
+    @classmethod
+    def fromFile(cls, path, workers=None, maxQueue=DEFAULT_ROOM_QUEUE, onResult=None):
+        return cls(loadRooms(path), workers, maxQueue, onResult)
+
+    #Queue a frame of volumes for a room, polling the room's DSP unless one is supplied
+    #A room whose queue is full drops its oldest waiting frame, so a backlog never delays its newest frames, unless block is set
+    #in which case the call waits for room in the queue, as when replaying recorded frames that must all be localized
+    def submit(self, roomName, signalArray=None, block=False):
+        room = self.rooms[roomName]
+        if signalArray is None:
+            signalArray = room.cameraController.getSignalsFromDSP()
+        frame = np.array(signalArray, dtype=float)
+        with self.lock:
+            while block and len(room.queue) == room.queue.maxlen:
+                self.lock.wait()
+            if len(room.queue) == room.queue.maxlen:
+                room.dropped += 1
+            room.queue.append((frame, time.perf_counter()))
+            room.submitted += 1
+            self.dispatch()
+
+    #Queue the current DSP frame of every room
+    def pollAll(self):
+        for roomName in self.rooms:
+            self.submit(roomName)
+
+    #Hand waiting frames to free workers, one room at a time in round robin order, must be called holding the lock
+    def dispatch(self):
+        checked = 0
+        while self.inFlight < self.workers and checked < len(self.roomOrder):
+            room = self.roomOrder[self.nextRoom]
+            self.nextRoom = (self.nextRoom + 1) % len(self.roomOrder)
+            if room.busy or not room.queue:
+                checked += 1
+                continue
+            frame, submitTime = room.queue.popleft()
+            room.busy = True
+            self.inFlight += 1
+            checked = 0
+            future = self.executor.submit(room.runJob, frame, submitTime)
+            future.add_done_callback(lambda future, room=room: self.finishJob(room, future))
+
+    #Record a finished job and start the next waiting ones
+    def finishJob(self, room, future):
+        result = None
+        with self.lock:
+            room.busy = False
+            self.inFlight -= 1
+            error = future.exception()
+            if error is None:
+                result = future.result()
+                room.completed += 1
+                room.failed += 0 if result["position"] else 1
+                room.busySeconds += result["solveSeconds"]
+                room.latencies.append(result["latency"])
+                room.lastResult = result
+            else:
+                room.failed += 1
+                logger.error("Localization job for room {0} failed: {1}".format(room.name, error))
+            self.dispatch()
+            self.lock.notify_all()
+        if result is not None and self.onResult is not None:
+            self.onResult(result)
+
+    #Wait until every queued frame has been localized
+    def drain(self):
+        with self.lock:
+            while self.inFlight or any(room.queue for room in self.roomOrder):
+                self.lock.wait()
+
+    #Summarize each room's throughput, latency and frame accounting since the manager started, with times in milliseconds
+    def getStats(self):
+        elapsed = time.perf_counter() - self.startTime
+        stats = {}
+        with self.lock:
+            for room in self.roomOrder:
+                roomStats = {
+                    "microphones": len(room.microphoneBank),
+                    "submitted": room.submitted,
+                    "completed": room.completed,
+                    "failed": room.failed,
+                    "dropped": room.dropped,
+                    "queued": len(room.queue),
+                    "fixesPerSecond": room.completed/elapsed if elapsed else None,
+                    "solveFixesPerSecond": room.completed/room.busySeconds if room.busySeconds else None,
+                    "latencyMs": instrumentation.summarizeSamples(room.latencies, scale=1000)
+                }
+                stats[room.name] = roomStats
+        return stats
+
+    #Wait for running jobs and shut the worker pool down
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
+
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Serve many rooms from one shared worker pool and report per-room throughput.")
+    parser.add_argument("rooms", help="JSON file of room configurations")
+    parser.add_argument("--frames", type=int, default=200, help="simulated frames per room")
+    parser.add_argument("--workers", type=int, help="worker threads shared by every room")
+    parser.add_argument("--queue", type=int, default=DEFAULT_ROOM_QUEUE, help="frames a room may have waiting")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    arguments = parseArguments()
+    rng = np.random.default_rng(arguments.seed)
+
+    with DeploymentManager.fromFile(arguments.rooms, arguments.workers, arguments.queue) as manager:
+        for _ in range(0, arguments.frames):
+            for room in manager.roomOrder:
+                dimensions = room.configuration["roomDimensions"]
+                signalPosition = rng.uniform([0.1, 0.1, 0.1], [dimensions[0] - 0.1, dimensions[1] - 0.1, dimensions[2] - 0.5])
+                room.microphoneBank.sendSignal(signalPosition, room.signalStrength)
+                manager.submit(room.name, block=True)
+        manager.drain()
+
+        for name, roomStats in manager.getStats().items():
+            latency = roomStats["latencyMs"]["p50"] if roomStats["latencyMs"] else float("nan")
+            print("-> {0}: {1} microphones, {2} fixes ({3} failed, {4} dropped), {5:.1f} fixes/s, p50 latency {6:.2f} ms"
+                  .format(name, roomStats["microphones"], roomStats["completed"], roomStats["failed"], roomStats["dropped"],
+                          roomStats["fixesPerSecond"], latency))
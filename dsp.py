@@ -1,3 +1,12 @@
+import logging
+
+import instrumentation
+from microphoneBank import MicrophoneBank
+
+logger = logging.getLogger(__name__)
+
+pollTimer = instrumentation.getTimer("dspPoll")
+
 #Class to represent a DSP object
 class DSP:
     def __init__(self, numPorts, microphones):
@@ -5,23 +14,32 @@ class DSP:
 
         #Ensure plugged in microphones don't exceed the capacity of the DSP
         if (len(microphones) > numPorts):
-            self.microphones = microphones[0:numPorts-1]
-            print("Plugged in too many microphones, reduced to {}.".format(numPorts))
+            self.microphones = microphones[0:numPorts]
+            logger.warning("Plugged in too many microphones, reduced to {}.".format(numPorts))
         else:
             self.microphones = microphones
 
         self.signalArray = []
 
         #If microphones are already receiving a signal, poll them and populate the signal array on DSP initiation
-        for microphone in microphones:
-            self.signalArray.append(microphone.getVolume())
+        if isinstance(microphones, MicrophoneBank):
+            self.signalArray = self.microphones.getVolumes()
+        else:
+            for microphone in self.microphones:
+                self.signalArray.append(microphone.getVolume())
 
     #Poll microphones to populate signal array
+    #A MicrophoneBank is read through a zero-copy view of its volume array, so the result tracks later signals
     def pollSignals(self):
-        self.signalArray = []
-        for microphone in self.microphones:
-            self.signalArray.append(microphone.getVolume())
-        return self.signalArray
+        with pollTimer:
+            if isinstance(self.microphones, MicrophoneBank):
+                self.signalArray = self.microphones.getVolumes()
+                return self.signalArray
+
+            self.signalArray = []
+            for microphone in self.microphones:
+                self.signalArray.append(microphone.getVolume())
+            return self.signalArray
 
     #Return the DSP signal array
     def getSignalArray(self):
@@ -31,3 +49,43 @@ class DSP:
     def getNumActiveMics(self):
         return len(self.microphones)
 
+
+#Class to represent several DSP units sharing one microphone array, for arrays with more microphones than one DSP has ports
+#Microphones are plugged into the units in order, numPorts at a time, and the group is polled like a single DSP
+class DSPGroup:
+    def __init__(self, numPorts, microphones):
+        self.numPorts = numPorts
+        self.microphones = microphones
+        self.units = []
+        for start in range(0, len(microphones), numPorts):
+            self.units.append(DSP(numPorts, microphones[start:start + numPorts]))
+        logger.info("-> {0} microphones split across {1} DSP units".format(len(microphones), len(self.units)))
+        self.signalArray = self.pollSignals()
+
+    #Poll every unit and join their signal arrays in microphone order
+    #Units plugged into slices of one MicrophoneBank all read that bank, so its zero-copy volume view is the joined array
+    def pollSignals(self):
+        if isinstance(self.microphones, MicrophoneBank):
+            for unit in self.units:
+                unit.pollSignals()
+            self.signalArray = self.microphones.getVolumes()
+            return self.signalArray
+
+        self.signalArray = []
+        for unit in self.units:
+            self.signalArray.extend(unit.pollSignals())
+        return self.signalArray
+
+    #Return the DSP signal array
+    def getSignalArray(self):
+        return self.signalArray
+
+    #Return the number of active microphones across every unit
+    def getNumActiveMics(self):
+        return sum(unit.getNumActiveMics() for unit in self.units)
+
+#Plug microphones into a single DSP, or a group of DSP units when there are more microphones than one unit has ports
+def createDSP(numPorts, microphones):
+    if len(microphones) > numPorts:
+        return DSPGroup(numPorts, microphones)
+    return DSP(numPorts, microphones)
@@ -0,0 +1,149 @@
+import hashlib
+import os
+
+import numpy as np
+import helpers
+
+#Default edge length of the voxels the room is divided into
+DEFAULT_VOXEL_SIZE = 0.25
+
+#Fewest microphones a grid search is run with, fewer than four, or microphones all in a line, leave whole curves of the room
+#fitting the volumes equally well
+MIN_GRID_MICS = 4
+
+#Number of the best scoring voxels the position is polished from, the best voxel is not always the one nearest the signal
+POLISH_STARTS = 8
+
+#Damped Gauss-Newton iterations used to polish a voxel into a position, with the starting damping and the step length,
+#in distance units, below which the position is taken as converged
+POLISH_ITERATIONS = 20
+POLISH_DAMPING = 1e-3
+POLISH_TOLERANCE = 1e-6
+
+#Number of voxel rows computed at a time while a table is being built, which bounds the temporaries the build needs
+BUILD_CHUNK_ROWS = 4096
+
+#Class to represent a lookup table of the attenuation (1 / distance) from every voxel in a room to every microphone
+#The table only depends on the microphone layout, room and voxel size, so it can be cached to disk and memory-mapped back in
+class AttenuationTable:
+    def __init__(self, micPositions, room, voxelSize=DEFAULT_VOXEL_SIZE, cacheDirectory=None):
+        self.micPositions = np.ascontiguousarray(np.asarray(micPositions, dtype=float).reshape(-1, 3))
+        self.room = room
+        self.voxelSize = voxelSize
+        self.voxels = helpers.generateRoomGrid(room, voxelSize)
+        self.path = None
+
+        if cacheDirectory is None:
+            self.table = np.empty((len(self.voxels), len(self.micPositions)), dtype=np.float32)
+            self.fill(self.table)
+        else:
+            self.path = os.path.join(cacheDirectory, "attenuation-{0}.npy".format(self.getCacheKey()))
+            if not os.path.exists(self.path):
+                self.build(self.path)
+            self.table = np.load(self.path, mmap_mode='r')
+
+        #Squared norm of each voxel's attenuation row, needed to score voxels in one pass
+        self.rowNorms = np.einsum('ij,ij->i', self.table, self.table, dtype=float)
+
+    #Identify the layout, room and voxel size a table was built for
+    def getCacheKey(self):
+        key = hashlib.sha1(self.micPositions.tobytes())
+        key.update(np.array([self.room.x, self.room.y, self.room.z, self.voxelSize], dtype=float).tobytes())
+        return key.hexdigest()[0:16]
+
+    #Write the table to a .npy file a chunk of voxels at a time, so building it never needs the whole table in memory
+    def build(self, path):
+        temporaryPath = path + ".partial"
+        table = np.lib.format.open_memmap(temporaryPath, mode='w+', dtype=np.float32, shape=(len(self.voxels), len(self.micPositions)))
+        self.fill(table)
+        table.flush()
+        del table
+        os.replace(temporaryPath, path)
+
+    #Fill a preallocated (V,N) table, in memory or on disk, a chunk of voxels at a time
+    def fill(self, table):
+        for start in range(0, len(self.voxels), BUILD_CHUNK_ROWS):
+            table[start:start + BUILD_CHUNK_ROWS] = self.getAttenuation(self.voxels[start:start + BUILD_CHUNK_ROWS])
+
+    #Attenuation from each of the (V,3) positions to every microphone, as a (V,N) array
+    def getAttenuation(self, positions):
+        offsets = positions[:, None, :] - self.micPositions[None, :, :]
+        distances = np.sqrt((offsets*offsets).sum(axis=2))
+
+        #A voxel sitting on a microphone would have infinite attenuation, so distances are floored at a quarter voxel
+        return 1/np.maximum(distances, self.voxelSize/4)
+
+    #Localize a signal from sensitivity-normalized microphone volumes (volume / sensitivity) by scoring every voxel at once,
+    #then polishing the best few voxels into positions and keeping the one that fits the volumes best
+    #When signalStrength is None the strength that best fits each voxel is used
+    #Returns the position, the signal strength and the root mean square volume residual
+    def localize(self, normalizedVolumes, signalStrength=None, polishStarts=POLISH_STARTS):
+        normalizedVolumes = np.asarray(normalizedVolumes, dtype=float)
+        scores = getVoxelScores(self.table.dot(normalizedVolumes.astype(np.float32)).astype(float), self.rowNorms, signalStrength)
+
+        #A voxel on the far side of a shallow peak can edge out the voxel nearest the signal, and the polish can stall against
+        #a wall, so several of the best voxels are polished
+        if len(scores) > polishStarts:
+            starts = np.argpartition(-scores, polishStarts - 1)[0:polishStarts]
+        else:
+            starts = np.arange(len(scores))
+        position = None
+        bestError = np.inf
+        for start in starts:
+            candidate = self.polish(self.voxels[start], normalizedVolumes, signalStrength)
+            error = self.getVolumeError(candidate, normalizedVolumes, signalStrength)[0]
+            if error < bestError:
+                position, bestError = candidate, error
+
+        attenuation = self.getAttenuation(position[None])[0]
+        if signalStrength is None:
+            signalStrength = max(attenuation.dot(normalizedVolumes)/attenuation.dot(attenuation), 0)
+        residual = normalizedVolumes - signalStrength*attenuation
+        return position, float(signalStrength), float(np.sqrt(residual.dot(residual)/len(residual)))
+
+    #Polish a voxel into a position with damped Gauss-Newton steps on the volume residuals v - s/|x - P|, a far signal seen
+    #by a small array lies on a long shallow ridge of the score that no grid is fine enough to follow, but the residuals still
+    #pin it down
+    #A step is only kept when it lowers the error, so noisy volumes can never make the voxel's answer worse
+    def polish(self, position, normalizedVolumes, signalStrength=None):
+        roomBounds = np.array([self.room.x, self.room.y, self.room.z], dtype=float)
+        error, strength = self.getVolumeError(position, normalizedVolumes, signalStrength)
+        damping = POLISH_DAMPING
+        for _ in range(0, POLISH_ITERATIONS):
+            offsets = position - self.micPositions
+            distances = np.maximum(np.sqrt((offsets*offsets).sum(axis=1)), self.voxelSize/4)
+            attenuation = 1/distances
+            jacobian = strength*offsets*(attenuation**3)[:, None]
+            if signalStrength is None:
+                jacobian = np.column_stack([jacobian, -attenuation])
+            residual = normalizedVolumes - strength*attenuation
+            normal = jacobian.T.dot(jacobian)
+            step = np.linalg.solve(normal + damping*np.diag(np.diag(normal) + 1e-12), -jacobian.T.dot(residual))[0:3]
+            candidate = np.clip(position + step, 0, roomBounds)
+            candidateError, candidateStrength = self.getVolumeError(candidate, normalizedVolumes, signalStrength)
+            if candidateError < error:
+                position, error, strength = candidate, candidateError, candidateStrength
+                damping = damping/10
+                if np.sqrt(step.dot(step)) < POLISH_TOLERANCE:
+                    break
+            else:
+                damping = damping*10
+                if damping > 1e6:
+                    break
+        return position
+
+    #Squared volume error at a position, and the signal strength it was measured at, the best fitting one when none is given
+    def getVolumeError(self, position, normalizedVolumes, signalStrength=None):
+        attenuation = self.getAttenuation(position[None])[0]
+        if signalStrength is None:
+            signalStrength = max(attenuation.dot(normalizedVolumes)/attenuation.dot(attenuation), 0)
+        residual = normalizedVolumes - signalStrength*attenuation
+        return residual.dot(residual), signalStrength
+
+#Score voxels by how much of the observed volumes they explain, higher is better
+#With a known strength s this is the negated squared error less the constant |v|^2, 2s(A.v) - s^2|A|^2, otherwise the
+#strength is fit per voxel and the score is (A.v)^2 / |A|^2 for voxels that need a positive strength
+def getVoxelScores(projections, rowNorms, signalStrength):
+    if signalStrength is not None:
+        return 2*signalStrength*projections - signalStrength*signalStrength*rowNorms
+    return np.where(projections > 0, projections*projections/rowNorms, 0)
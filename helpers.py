@@ -1,8 +1,11 @@
+import logging
 import math
 from numpy import sqrt, dot, cross
 from numpy.linalg import norm
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
 #Return the 3-dimensional distance between two points in space
 def get3DDistance(point1, point2):
     return math.sqrt((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2 + (point1[2] - point2[2]) ** 2)
@@ -13,9 +16,17 @@ def generateMicArray(x, y, scale, cieling):
     for a in range(0, x):
         for b in range(0, y):
             micArray.append([a*scale, b*scale, cieling])
-    print("-> {0}x{1} microphone array generated with spacing of {2} at z-level {3}".format(x, y, scale, cieling))
+    logger.info("-> {0}x{1} microphone array generated with spacing of {2} at z-level {3}".format(x, y, scale, cieling))
     return micArray
 
+#Generate an (V,3) array of candidate positions on a regular grid filling the room, including its walls, floor and ceiling
+def generateRoomGrid(room, spacing):
+    xs = np.arange(0, room.x + spacing/2, spacing)
+    ys = np.arange(0, room.y + spacing/2, spacing)
+    zs = np.arange(0, room.z + spacing/2, spacing)
+    grid = np.stack(np.meshgrid(xs, ys, zs, indexing='ij'), axis=-1)
+    return grid.reshape(-1, 3)
+
 #Get the unit vector betwween two points
 def getUnitVector(point1, point2):
     outputVector = [0, 0, 0]
@@ -24,12 +35,21 @@ def getUnitVector(point1, point2):
         outputVector[x] = (point1[x] - point2[x]) / distance
     return outputVector
 
-#Calculate degree heading from a unit vector
+#Calculate degree heading from a unit vector, the azimuth from the x-axis towards the y-axis over the full circle and the elevation
+#above the horizontal plane
 def getDegreeHeading(unitVector):
-    angleA = np.arccos(unitVector[0])
-    angleB = np.arcsin(unitVector[2])
+    angleA = np.arctan2(unitVector[1], unitVector[0])
+    angleB = np.arctan2(unitVector[2], np.hypot(unitVector[0], unitVector[1]))
     return [np.degrees(angleA), np.degrees(angleB)]
 
+#Pan and tilt in degrees that point from each origin at each target, where origins and targets are (...,3) arrays that broadcast
+#together, as getDegreeHeading but for any number of points at once and without normalizing the offsets first
+def getPanTilt(origins, targets):
+    offsets = np.asarray(targets, dtype=float) - np.asarray(origins, dtype=float)
+    pan = np.degrees(np.arctan2(offsets[..., 1], offsets[..., 0]))
+    tilt = np.degrees(np.arctan2(offsets[..., 2], np.hypot(offsets[..., 0], offsets[..., 1])))
+    return pan, tilt
+
 # Find the intersection of three spheres where P1,P2,P3 are the centers, and r1,r2,r3 are the radii
 def trilaterate(P1,P2,P3,r1,r2,r3):
     temp1 = P2-P1
@@ -51,6 +71,211 @@ def trilaterate(P1,P2,P3,r1,r2,r3):
     p_12_b = P1 + x*e_x + y*e_y - z*e_z
     return p_12_a,p_12_b
 
+#Generate the index of every non-repeating combination of 3 microphones as an (M,3) array, in the same order as itertools.combinations
+def getTripleIndices(count):
+    if count < 3:
+        return np.empty((0, 3), dtype=np.intp)
+
+    #Every pair (a, b) with a < b is followed by each c in b+1..count-1
+    pairA, pairB = np.triu_indices(count, 1)
+    tailCounts = count - 1 - pairB
+    a = np.repeat(pairA, tailCounts)
+    b = np.repeat(pairB, tailCounts)
+    starts = np.repeat(np.cumsum(tailCounts) - tailCounts, tailCounts)
+    c = b + 1 + (np.arange(len(a)) - starts)
+    return np.stack([a, b, c], axis=1)
+
+#Area of the triangle formed by each (M,3) index triple into the (N,3) sphere centers, collinear triples have zero area
+def getTriangleAreas(centers, triples):
+    componentRows = np.ascontiguousarray(np.asarray(centers, dtype=float).T)
+    indices = np.asarray(triples, dtype=np.intp).reshape(-1, 3).T
+    P1 = componentRows[:, indices[0]]
+    normal = rowCross(componentRows[:, indices[1]] - P1, componentRows[:, indices[2]] - P1)
+    return 0.5*sqrt(rowDot(normal, normal))
+
+#Precompute the radius independent part of trilateration for an (M,3) index array of triples into the (N,3) sphere centers
+#Everything here depends only on microphone positions, so it can be computed once per layout
+def getTrilaterationBasis(centers, triples):
+    centers = np.asarray(centers, dtype=float)
+    triples = np.asarray(triples, dtype=np.intp).reshape(-1, 3)
+
+    #Work on (3,M) component rows so every vector operation runs over contiguous memory
+    componentRows = np.ascontiguousarray(centers.T)
+    indices = np.ascontiguousarray(triples.T)
+    P1 = componentRows[:, indices[0]]
+    P2 = componentRows[:, indices[1]]
+    P3 = componentRows[:, indices[2]]
+
+    #Collinear or repeated microphones produce zero length basis vectors, these are flagged as invalid during trilateration
+    with np.errstate(divide='ignore', invalid='ignore'):
+        temp1 = P2-P1
+        d = sqrt(rowDot(temp1, temp1))
+        e_x = temp1/d
+        temp2 = P3-P1
+        i = rowDot(e_x, temp2)
+        temp3 = temp2 - i*e_x
+        e_y = temp3/sqrt(rowDot(temp3, temp3))
+        e_z = rowCross(e_x, e_y)
+        j = rowDot(e_y, temp2)
+
+    return {"indices": indices, "P1": P1, "e_x": e_x, "e_y": e_y, "e_z": e_z, "d": d, "i": i, "j": j}
+
+#Find the intersections of many sphere triples in one pass, where centers is (N,3), radii is (N,) and triples is an (M,3) index array
+#A basis from getTrilaterationBasis can be passed in place of the triples so only the radius dependent math runs
+#Returns both intersection points of every triple as (M,3) arrays and a mask marking which triples actually intersect instead of raising
+def trilaterateBatch(centers, radii, triples=None, basis=None):
+    radii = np.asarray(radii, dtype=float)
+    if basis is None:
+        if triples is None:
+            triples = getTripleIndices(len(centers))
+        basis = getTrilaterationBasis(centers, triples)
+
+    indices = basis["indices"]
+    e_x, e_y, e_z = basis["e_x"], basis["e_y"], basis["e_z"]
+    d, i, j = basis["d"], basis["i"], basis["j"]
+    r1 = radii[indices[0]]
+    r2 = radii[indices[1]]
+    r3 = radii[indices[2]]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (r1*r1 - r2*r2 + d*d) / (2*d)
+        y = (r1*r1 - r3*r3 -2*i*x + i*i + j*j) / (2*j)
+        temp4 = r1*r1 - x*x - y*y
+
+    valid = temp4 >= 0
+    z = sqrt(np.where(valid, temp4, 0))
+    base = basis["P1"] + x*e_x + y*e_y
+    p_12_a = base + z*e_z
+    p_12_b = base - z*e_z
+    valid &= np.isfinite(p_12_a).all(axis=0) & np.isfinite(p_12_b).all(axis=0)
+    return p_12_a.T, p_12_b.T, valid
+
+#Dot product of two (3,M) arrays of column vectors
+def rowDot(a, b):
+    return a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
+
+#Cross product of two (3,M) arrays of column vectors
+def rowCross(a, b):
+    return np.stack([a[1]*b[2] - a[2]*b[1], a[2]*b[0] - a[0]*b[2], a[0]*b[1] - a[1]*b[0]])
+
+#Precompute the radius independent part of multilateration, the differenced sphere equation matrix and its decomposition
+def getMultilaterationSystem(centers):
+    centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+    if len(centers) < 3:
+        return {"centers": centers, "rank": 0}
+    centerNorms = (centers*centers).sum(axis=1)
+    A = 2*(centers - centers.mean(axis=0))
+    U, S, Vt = np.linalg.svd(A, full_matrices=False)
+    rank = int((S > S[0]*1e-9).sum()) if len(S) and S[0] > 0 else 0
+    return {"centers": centers, "centerNorms": centerNorms, "U": U, "S": S, "Vt": Vt, "rank": rank}
+
+#Solve for the signal position against all N spheres at once by linear least-squares on the differenced sphere equations
+#A system from getMultilaterationSystem can be passed in so only the radius dependent math runs
+#Returns a list with the single solution, or both mirror image solutions when every microphone lies in one plane
+def multilaterate(centers, radii, system=None):
+    radii = np.asarray(radii, dtype=float)
+    if len(radii) < 3:
+        return []
+    if system is None:
+        system = getMultilaterationSystem(centers)
+    if system["rank"] < 2:
+        return []
+    centers = system["centers"]
+    U, S, Vt, rank = system["U"], system["S"], system["Vt"], system["rank"]
+
+    #Subtracting the mean sphere equation removes the quadratic term: 2(Pi - Pm).x = |Pi|^2 - mean|P|^2 - (ri^2 - mean r^2)
+    centerNorms = system["centerNorms"]
+    b = (centerNorms - centerNorms.mean()) - (radii*radii - (radii*radii).mean())
+    solution = Vt[:rank].T.dot(U[:, :rank].T.dot(b)/S[:rank])
+    if rank == 3:
+        return [solution]
+
+    #With a planar array the offset along the plane normal is fit to the sphere equations directly: t^2 + 2Bt + C = 0
+    normal = Vt[2]
+    offsets = solution - centers
+    B = offsets.dot(normal).mean()
+    C = ((offsets*offsets).sum(axis=1) - radii*radii).mean()
+    spread = sqrt(max(B*B - C, 0))
+    return [solution + (-B - spread)*normal, solution + (-B + spread)*normal]
+
+#Refine a multilateration estimate with Gauss-Newton iterations on the sphere range residuals
+#Returns the refined point and its root mean square residual
+def refineMultilateration(centers, radii, point, iterations=5):
+    centers = np.asarray(centers, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    point = np.asarray(point, dtype=float)
+    for _ in range(iterations):
+        offsets = point - centers
+        distances = np.maximum(norm(offsets, axis=1), 1e-12)
+        jacobian = offsets/distances[:, None]
+        step = np.linalg.lstsq(jacobian, distances - radii, rcond=None)[0]
+        point = point - step
+        if norm(step) < 1e-9:
+            break
+    return point, getSphereResidual(centers, radii, point)
+
+#Solve jointly for the signal position and an unknown signal strength, where the sphere radius of microphone i is
+#strength * distanceRatios[i]. Expanding |x - Pi|^2 = s^2 ki^2 is linear in (x, |x|^2, s^2), which gives the starting point
+#Returns a list of (point, strength, residual), two mirror image solutions when every microphone lies in one plane
+def solvePositionAndStrength(centers, distanceRatios, iterations=10):
+    centers = np.asarray(centers, dtype=float)
+    distanceRatios = np.asarray(distanceRatios, dtype=float)
+    if len(centers) < 5:
+        return []
+
+    A = np.column_stack([-2*centers, np.ones(len(centers)), -distanceRatios*distanceRatios])
+    b = -(centers*centers).sum(axis=1)
+    U, S, Vt = np.linalg.svd(A, full_matrices=False)
+    rank = int((S > S[0]*1e-9).sum())
+    solution = Vt[:rank].T.dot(U[:, :rank].T.dot(b)/S[:rank])
+
+    if rank == 5:
+        starts = [solution]
+    elif rank == 4:
+        #Planar arrays leave one free direction, which is pinned down by requiring the |x|^2 unknown to equal |x|^2
+        normal = Vt[4]
+        a = -normal[0:3].dot(normal[0:3])
+        B = normal[3] - 2*solution[0:3].dot(normal[0:3])
+        C = solution[3] - solution[0:3].dot(solution[0:3])
+        spread = sqrt(max(B*B - 4*a*C, 0))
+        starts = [solution + ((-B - spread)/(2*a))*normal, solution + ((-B + spread)/(2*a))*normal]
+    else:
+        return []
+
+    solutions = []
+    for start in starts:
+        strength = sqrt(max(start[4], 0))
+        solutions.append(refinePositionAndStrength(centers, distanceRatios, start[0:3], strength, iterations))
+    return solutions
+
+#Refine a joint position and strength estimate with Gauss-Newton iterations on the range residuals |x - Pi| - s*ki
+#Returns the refined point, strength and root mean square residual
+def refinePositionAndStrength(centers, distanceRatios, point, strength, iterations=10):
+    point = np.asarray(point, dtype=float)
+    for _ in range(iterations):
+        offsets = point - centers
+        distances = np.maximum(norm(offsets, axis=1), 1e-12)
+        jacobian = np.column_stack([offsets/distances[:, None], -distanceRatios])
+        step = np.linalg.lstsq(jacobian, distances - strength*distanceRatios, rcond=None)[0]
+        point = point - step[0:3]
+        strength = abs(strength - step[3])
+        if norm(step) < 1e-9:
+            break
+    return point, float(strength), getSphereResidual(centers, strength*distanceRatios, point)
+
+#Indices of the count positions closest to a point, in no particular order
+def getNearestIndices(positions, point, count):
+    offsets = np.asarray(positions, dtype=float) - point
+    distances = (offsets*offsets).sum(axis=1)
+    if count >= len(distances):
+        return np.arange(len(distances))
+    return np.argpartition(distances, count)[0:count]
+
+#Root mean square distance between a point and the surfaces of a set of spheres
+def getSphereResidual(centers, radii, point):
+    distances = norm(np.asarray(centers, dtype=float) - point, axis=1)
+    return float(sqrt(((distances - radii)**2).mean()))
+
 #Determine if any points fall outside the room
 def allInRoom(points, room):
     for x in points:
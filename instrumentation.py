@@ -0,0 +1,134 @@
+#Optional timers and counters for the stages of the localization pipeline
+#Instrumentation is off by default and then costs one flag check per stage, enable it with enable() or by setting the
+#SIGNAL_LOCALIZER_PROFILE environment variable, read the totals with getStats() and write per-call timings with dumpTrace()
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+#Default number of per-call stage timings kept for the trace dump
+DEFAULT_TRACE_LIMIT = 100000
+
+enabled = False
+tracing = False
+stageTotals = {}
+counters = {}
+traceEvents = deque(maxlen=DEFAULT_TRACE_LIMIT)
+
+#Guards the totals, counters and trace, stages are timed from worker threads such as the deployment manager's
+statsLock = threading.Lock()
+
+#Class to time one named pipeline stage, used as a context manager around the stage
+#The start time of a run is kept per thread, so threads can time the same stage at once, but a stage must not be nested
+#inside itself on one thread
+class StageTimer:
+    __slots__ = ("name", "runs")
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = threading.local()
+
+    def __enter__(self):
+        self.runs.start = time.perf_counter() if enabled else None
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        start = self.runs.start
+        if start is not None:
+            recordStage(self.name, start, time.perf_counter() - start)
+            self.runs.start = None
+        return False
+
+#Timers are shared per stage name so the modules that use them can create them once at import
+stageTimers = {}
+
+#Return the timer for a named stage
+def getTimer(name):
+    if name not in stageTimers:
+        stageTimers[name] = StageTimer(name)
+    return stageTimers[name]
+
+#Turn instrumentation on, optionally keeping the timing of every stage call for dumpTrace
+def enable(trace=False, traceLimit=DEFAULT_TRACE_LIMIT):
+    global enabled, tracing, traceEvents
+    enabled = True
+    tracing = trace
+    with statsLock:
+        if traceEvents.maxlen != traceLimit:
+            traceEvents = deque(traceEvents, maxlen=traceLimit)
+
+#Turn instrumentation off, the collected totals are kept until reset
+def disable():
+    global enabled, tracing
+    enabled = False
+    tracing = False
+
+#Clear every collected timing, counter and trace event
+def reset():
+    with statsLock:
+        stageTotals.clear()
+        counters.clear()
+        traceEvents.clear()
+
+#Add one run of a stage to its totals
+def recordStage(name, start, seconds):
+    with statsLock:
+        totals = stageTotals.get(name)
+        if totals is None:
+            stageTotals[name] = [1, seconds, seconds]
+        else:
+            totals[0] += 1
+            totals[1] += seconds
+            if seconds > totals[2]:
+                totals[2] = seconds
+        if tracing:
+            traceEvents.append((name, start, seconds))
+
+#Increase a named counter, such as the number of rejected microphone triples
+def count(name, amount=1):
+    if enabled:
+        with statsLock:
+            counters[name] = counters.get(name, 0) + amount
+
+#Summarize the time spent in each stage, with times in milliseconds, and the counters
+def getStats():
+    stages = {}
+    with statsLock:
+        totals = {name: list(stageTotal) for name, stageTotal in stageTotals.items()}
+        counterTotals = dict(counters)
+    for name, (calls, totalSeconds, maxSeconds) in totals.items():
+        stages[name] = {
+            "calls": calls,
+            "totalMs": totalSeconds*1000,
+            "meanMs": totalSeconds*1000/calls,
+            "maxMs": maxSeconds*1000
+        }
+    return {"stages": stages, "counters": counterTotals}
+
+#Summarize a set of samples, such as latencies, as their mean, the given percentiles and their maximum, each multiplied by scale
+#Returns None when there are no samples
+def summarizeSamples(samples, percentiles=(50, 99), scale=1):
+    samples = np.asarray(samples, dtype=float)*scale
+    if not len(samples):
+        return None
+    summary = {"mean": float(samples.mean())}
+    for percentile in percentiles:
+        summary["p{0}".format(percentile)] = float(np.percentile(samples, percentile))
+    summary["max"] = float(samples.max())
+    return summary
+
+#Write the traced stage calls as JSON lines of stage name, start time and duration in seconds, oldest first
+#Returns the number of events written
+def dumpTrace(path):
+    with statsLock:
+        events = list(traceEvents)
+    with open(path, "w") as traceFile:
+        for name, start, seconds in events:
+            traceFile.write(json.dumps({"stage": name, "start": start, "seconds": seconds}) + "\n")
+    return len(events)
+
+if os.environ.get("SIGNAL_LOCALIZER_PROFILE"):
+    enable(trace=os.environ.get("SIGNAL_LOCALIZER_PROFILE") == "trace")
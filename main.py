@@ -1,72 +1,21 @@
 # Peter Donaldson - 11/7/2020
-from microphone import Microphone
-from dsp import DSP
-from cameraController import CameraController
-import helpers
-from room import Room
-from visualizer import visualize
-from tkinter import *
-import matplotlib.pyplot as plt
+import logging
 
-def runVisualizer(roomDimensions, microphoneSensitivity, signalPos, sigStrength, micGrid, gridOffset, gridHeight, camPos):
-    # Room parameters
-    width = roomDimensions[0]
-    length = roomDimensions[1]
-    ceiling = roomDimensions[2]
-
-    # Define room
-    room = Room(width, length, ceiling)
-
-    # Create a microphone array
-    microphonePositions = helpers.generateMicArray(micGrid[0], micGrid[1], gridOffset, gridHeight)
-    if not helpers.allInRoom(microphonePositions, room):
-        print("Some microphones fell outside the boundaries of the room, please re-enter data.")
-        return
-
-    # Microphone parameters
-    numMicrophones = len(microphonePositions)
-    microphoneArray = []
-    micSensitivity = microphoneSensitivity
+import pipeline
 
-    # Set up microphone objects
-    for x in range(0, numMicrophones):
-        microphoneArray.append(Microphone(microphonePositions[x], micSensitivity))
-
-    # Configure DSP object
-    dsp = DSP(99, microphoneArray)
-
-    # Set up camera controller
-    cameraPosition = camPos
-    if not helpers.allInRoom([cameraPosition], room):
-        print("The camera fell outside the boundaries of the room, please re-enter data.")
-        return
-    cameraOrientation = [0, 0]  # pointing along x-axis in degrees
-    cameraController = CameraController(cameraPosition, cameraOrientation, dsp, room)
-    cameraController.setMicSensitivity(micSensitivity)
-    cameraController.setMicPositions(microphonePositions)
-
-    # Define Signal parameters
-    signalPosition = signalPos
-    if not helpers.allInRoom([signalPosition], room):
-        print("The signal fell outside the boundaries of the room, please re-enter data.")
+def runVisualizer(roomDimensions, microphoneSensitivity, signalPos, sigStrength, micGrid, gridOffset, gridHeight, camPos):
+    # Run the headless pipeline: room, microphones, DSP, localization and camera heading
+    scenario = pipeline.runScenario(roomDimensions, microphoneSensitivity, signalPos, sigStrength, micGrid, gridOffset, gridHeight, camPos)
+    if scenario is None:
         return
-    signalStrength = sigStrength
-
-    # Send signal to all microphones
-    for microphone in microphoneArray:
-        microphone.sendSignal(signalPosition, signalStrength)
-    print(
-        "-> Audio signal at position x: {0}, y: {1}, z: {2} with strength {3} broadcast to all microphones".format(
-            signalPosition[0], signalPosition[1], signalPosition[2], signalStrength))
-
-    # Predict signal location using sphere trilateration
-    predictedSignalLocation = cameraController.getSignalPosition(signalStrength)
+    result, cameraController = scenario
+    predictedSignalLocation = result["predicted"]
     print("->>> Predicted Signal Location: {0}, Actual Signal Location: {1}".format(predictedSignalLocation,
-                                                                                  signalPosition))
+                                                                                  signalPos))
 
-    cameraController.rePositionCamera(predictedSignalLocation)
-
-    visualize(cameraController, signalStrength, predictedSignalLocation)
+    # Plotting is optional and only imported when something is actually drawn
+    from visualizer import visualize
+    visualize(cameraController, sigStrength, predictedSignalLocation)
 
 def getEntryList(entryField):
     outputArray = entryField.get().replace(" ", "").split(",")
@@ -81,6 +30,12 @@ def getEntryListInt(entryField):
     return outputArray
 
 if __name__ == '__main__':
+    from tkinter import *
+    import matplotlib.pyplot as plt
+
+    # Show the pipeline's progress messages on the console
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     app = Tk()
     app.title('Signal Tracker')
     app.geometry('350x350')
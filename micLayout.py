@@ -0,0 +1,71 @@
+import numpy as np
+import helpers
+import instrumentation
+
+#Upper bound on the number of microphone triples kept per layout, so trilateration cost stays bounded as the grid grows
+DEFAULT_MAX_TRIPLES = 20000
+
+#Triangles smaller than this fraction of the squared array span are treated as collinear
+MIN_RELATIVE_TRIANGLE_AREA = 1e-6
+
+tripleTimer = instrumentation.getTimer("tripleSelection")
+
+#Class to hold the precomputed geometry of a fixed microphone layout, built once when the positions are set
+class MicLayout:
+    def __init__(self, micPositions, maxTriples=DEFAULT_MAX_TRIPLES):
+        self.positions = np.ascontiguousarray(np.asarray(micPositions, dtype=float).reshape(-1, 3))
+        self.count = len(self.positions)
+        self.maxTriples = maxTriples
+
+        #Pairwise separation distance between every pair of microphones
+        offsets = self.positions[:, None, :] - self.positions[None, :, :]
+        self.distanceMatrix = np.sqrt((offsets*offsets).sum(axis=2))
+
+        #Per-triple basis vectors and scalars for the well-conditioned triples, and the least-squares system for multilateration
+        with tripleTimer:
+            self.triples, self.triangleAreas = self.selectTriples(maxTriples)
+        self.trilaterationBasis = helpers.getTrilaterationBasis(self.positions, self.triples)
+        self.multilaterationSystem = helpers.getMultilaterationSystem(self.positions)
+
+    #Rank every microphone triple by triangle area, drop the collinear ones and keep at most maxTriples of the best conditioned
+    #Triples are scored one leading microphone at a time so memory stays bounded by maxTriples rather than the full combination count
+    #Returns the selected (M,3) triple index and the matching triangle areas, largest first
+    def selectTriples(self, maxTriples):
+        span = self.distanceMatrix.max() if self.count else 0
+        minArea = MIN_RELATIVE_TRIANGLE_AREA*span*span
+
+        tripleChunks = []
+        areaChunks = []
+        pendingCount = 0
+        for a in range(0, self.count - 2):
+            pairB, pairC = np.triu_indices(self.count - a - 1, 1)
+            triples = np.stack([np.full(len(pairB), a), pairB + a + 1, pairC + a + 1], axis=1)
+            areas = helpers.getTriangleAreas(self.positions, triples)
+            wellConditioned = areas > minArea
+            instrumentation.count("collinearTriples", len(areas) - int(wellConditioned.sum()))
+            tripleChunks.append(triples[wellConditioned])
+            areaChunks.append(areas[wellConditioned])
+            pendingCount += len(areaChunks[-1])
+
+            #Periodically discard everything outside the current top maxTriples
+            if maxTriples is not None and pendingCount > 2*maxTriples:
+                tripleChunks, areaChunks = [np.concatenate(tripleChunks)], [np.concatenate(areaChunks)]
+                best = np.argpartition(-areaChunks[0], maxTriples - 1)[0:maxTriples]
+                tripleChunks, areaChunks = [tripleChunks[0][best]], [areaChunks[0][best]]
+                pendingCount = maxTriples
+
+        if not areaChunks:
+            return np.empty((0, 3), dtype=np.intp), np.empty(0)
+        triples = np.concatenate(tripleChunks)
+        areas = np.concatenate(areaChunks)
+        if maxTriples is not None and len(areas) > maxTriples:
+            best = np.argpartition(-areas, maxTriples - 1)[0:maxTriples]
+            triples, areas = triples[best], areas[best]
+
+        order = np.argsort(-areas, kind='stable')
+        return triples[order], areas[order]
+
+    #Check whether this layout was built from the given microphone positions
+    def matches(self, micPositions):
+        positions = np.asarray(micPositions, dtype=float).reshape(-1, 3)
+        return positions.shape == self.positions.shape and np.array_equal(positions, self.positions)
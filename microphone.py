@@ -1,5 +1,9 @@
+import logging
+
 import helpers
 
+logger = logging.getLogger(__name__)
+
 #Class to represent a microphone object
 class Microphone:
 
@@ -13,10 +17,22 @@ class Microphone:
     def sendSignal(self, position, signal):
         distance = helpers.get3DDistance(self.position, position)
         if distance <= 0:
-            print("Signal occurred inside microphone, sensor clipping, volume reset.")
+            logger.warning("Signal occurred inside microphone, sensor clipping, volume reset.")
             return
         self.volume = (signal/distance)*self.sensitivity
 
+    #Add a signal on top of whatever the microphone is already registering, so simultaneous sources superpose
+    def addSignal(self, position, signal):
+        distance = helpers.get3DDistance(self.position, position)
+        if distance <= 0:
+            logger.warning("Signal occurred inside microphone, sensor clipping, signal ignored.")
+            return
+        self.volume += (signal/distance)*self.sensitivity
+
+    #Reset the microphone to silence
+    def clearSignal(self):
+        self.volume = 0
+
     #Return the volume the microphone has registered
     def getVolume(self):
         return self.volume
\ No newline at end of file
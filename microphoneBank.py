@@ -0,0 +1,114 @@
+import logging
+
+import numpy as np
+from microphone import Microphone
+
+logger = logging.getLogger(__name__)
+
+#Class to represent a bank of microphones whose positions, sensitivities and volumes are held in contiguous arrays
+class MicrophoneBank:
+
+    def __init__(self, positions, sensitivities, volumes=None):
+        self.positions = np.ascontiguousarray(np.asarray(positions, dtype=float).reshape(-1, 3))
+        count = len(self.positions)
+
+        # in units of volume/distance, either one value for the whole bank or one per microphone
+        if np.ndim(sensitivities) == 0:
+            self.sensitivities = np.full(count, float(sensitivities))
+        else:
+            self.sensitivities = np.asarray(sensitivities, dtype=float)
+        if volumes is None:
+            self.volumes = np.zeros(count)
+        else:
+            self.volumes = np.asarray(volumes, dtype=float)
+
+    #Build a bank holding the state of existing microphone objects
+    @classmethod
+    def fromMicrophones(cls, microphones):
+        return cls([microphone.position for microphone in microphones],
+                   [microphone.sensitivity for microphone in microphones],
+                   [microphone.volume for microphone in microphones])
+
+    #Send a signal to every microphone at once and store the resulting volumes
+    def sendSignal(self, position, signal):
+        volumes, received = self.getSignalVolumes(position, signal)
+
+        #Microphones the signal occurred inside of keep their previous volume, as with a single Microphone
+        if not received.all():
+            logger.warning("Signal occurred inside microphone, sensor clipping, volume reset.")
+            self.volumes[received] = volumes[received]
+            return
+        self.volumes[:] = volumes
+
+    #Add a signal on top of what every microphone is already registering, so simultaneous sources superpose
+    def addSignal(self, position, signal):
+        volumes, received = self.getSignalVolumes(position, signal)
+        if not received.all():
+            logger.warning("Signal occurred inside microphone, sensor clipping, signal ignored.")
+        self.volumes[received] += volumes[received]
+
+    #Reset every microphone to silence
+    def clearSignal(self):
+        self.volumes[:] = 0
+
+    #Volume each microphone would register from a signal, and a mask of the microphones the signal is not inside of
+    def getSignalVolumes(self, position, signal):
+        offsets = self.positions - np.asarray(position, dtype=float)
+        distances = np.sqrt((offsets*offsets).sum(axis=1))
+        received = distances > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (signal/distances)*self.sensitivities, received
+
+    #Return the volumes the microphones have registered, this is a live view rather than a copy
+    def getVolumes(self):
+        return self.volumes
+
+    #Return the number of microphones in the bank
+    def __len__(self):
+        return len(self.positions)
+
+    #Index a single microphone, or slice out a bank that shares this bank's arrays
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MicrophoneBank(self.positions[index], self.sensitivities[index], self.volumes[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("microphone index out of range")
+        return BankedMicrophone(self, index)
+
+    #Iterate over the microphones in the bank
+    def __iter__(self):
+        for index in range(0, len(self)):
+            yield BankedMicrophone(self, index)
+
+#Class to represent a single microphone backed by a slot in a MicrophoneBank, it keeps the Microphone API working
+class BankedMicrophone(Microphone):
+
+    def __init__(self, bank, index):
+        self.bank = bank
+        self.index = index
+
+    @property
+    def position(self):
+        return self.bank.positions[self.index]
+
+    @position.setter
+    def position(self, position):
+        self.bank.positions[self.index] = position
+
+    @property
+    def sensitivity(self):
+        return self.bank.sensitivities[self.index]
+
+    @sensitivity.setter
+    def sensitivity(self, sensitivity):
+        self.bank.sensitivities[self.index] = sensitivity
+
+    @property
+    def volume(self):
+        return self.bank.volumes[self.index]
+
+    @volume.setter
+    def volume(self, volume):
+        self.bank.volumes[self.index] = volume
@@ -0,0 +1,176 @@
+import numpy as np
+import helpers
+
+#Default spacing of the candidate source grid over the room
+DEFAULT_GRID_SPACING = 0.5
+
+#The refinement pass around each source searches a grid this many times finer than the candidate grid
+REFINE_FACTOR = 5
+
+#Maximum number of passes swapping each source for a better candidate after the greedy selection
+EXCHANGE_ROUNDS = 5
+
+#Maximum number of fine grid refinement passes over the sources
+REFINE_ROUNDS = 10
+
+#Maximum number of off-grid Levenberg-Marquardt iterations polishing the final sources
+REFINE_ITERATIONS = 20
+
+#Class to hold the volume every microphone registers from a unit signal at each candidate position in a room
+#Built once per microphone layout, it lets several simultaneous sources be separated from a single frame of volumes
+class SourceDictionary:
+    def __init__(self, micPositions, sensitivities, room, gridSpacing=DEFAULT_GRID_SPACING):
+        self.micPositions = np.asarray(micPositions, dtype=float).reshape(-1, 3)
+        self.sensitivities = np.broadcast_to(np.asarray(sensitivities, dtype=float), (len(self.micPositions),))
+        self.room = room
+        self.gridSpacing = gridSpacing
+
+        self.candidates = helpers.generateRoomGrid(room, gridSpacing)
+        self.atoms = self.getAtoms(self.candidates)
+        self.atomNorms = np.sqrt((self.atoms*self.atoms).sum(axis=1))
+
+    #Volume every microphone registers from a unit signal at each of the (V,3) positions, as a (V,N) array
+    def getAtoms(self, positions):
+        offsets = positions[:, None, :] - self.micPositions[None, :, :]
+        distances = np.sqrt((offsets*offsets).sum(axis=2))
+
+        #A candidate sitting on a microphone would register an infinite volume, so distances are floored at a quarter grid step
+        return self.sensitivities/np.maximum(distances, self.gridSpacing/4)
+
+    #Separate up to numSources simultaneous signals from one frame of superposed microphone volumes
+    #Sources are picked greedily, then each is repeatedly swapped for whichever candidate best explains the frame jointly with the
+    #others, and finally refined on a finer grid around it
+    #Returns [position, strength, confidence] for each source found, most confident first, where confidence is the share of the
+    #frame's volume energy that only that source explains
+    def localize(self, signalArray, numSources, exchangeRounds=EXCHANGE_ROUNDS, refineRounds=REFINE_ROUNDS):
+        signalArray = np.asarray(signalArray, dtype=float)
+        signalEnergy = signalArray.dot(signalArray)
+        if signalEnergy <= 0:
+            return []
+
+        #Greedy selection, each new source is the candidate that most reduces the joint least-squares residual
+        selected = []
+        for _ in range(0, numSources):
+            scores = getJointFitScores(self.atoms, self.atoms[selected], signalArray)
+            best = int(np.argmax(scores))
+            if scores[best] <= 0:
+                break
+            selected.append(best)
+
+        #Swap sources one at a time for a better candidate until the selection settles, this escapes the single strong source
+        #between the real ones that greedy selection tends to lock onto first
+        for _ in range(0, exchangeRounds):
+            changed = False
+            for k in range(0, len(selected)):
+                others = self.atoms[selected[0:k] + selected[k+1:]]
+                best = int(np.argmax(getJointFitScores(self.atoms, others, signalArray)))
+                if best != selected[k]:
+                    selected[k] = best
+                    changed = True
+            if not changed:
+                break
+
+        #Refine each source on a finer grid around it, repeating while any source still moves
+        positions = [self.candidates[index] for index in selected]
+        atoms = [self.atoms[index] for index in selected]
+        for _ in range(0, refineRounds):
+            changed = False
+            for k in range(0, len(positions)):
+                localPositions = self.getLocalGrid(positions[k])
+                localAtoms = self.getAtoms(localPositions)
+                others = np.array(atoms[0:k] + atoms[k+1:]).reshape(-1, len(signalArray))
+                best = int(np.argmax(getJointFitScores(localAtoms, others, signalArray)))
+                if not np.array_equal(localPositions[best], positions[k]):
+                    positions[k] = localPositions[best]
+                    atoms[k] = localAtoms[best]
+                    changed = True
+            if not changed:
+                break
+
+        if not atoms:
+            return []
+        strengths = fitStrengths(np.array(atoms).T, signalArray)
+        positions, strengths = self.refineSources(np.array(positions), strengths, signalArray)
+        atoms = list(self.getAtoms(positions))
+        residual = signalArray - np.array(atoms).T.dot(strengths)
+        residualEnergy = residual.dot(residual)
+
+        sources = []
+        for k in range(0, len(positions)):
+            if strengths[k] <= 0:
+                continue
+            withoutSource = residual + atoms[k]*strengths[k]
+            confidence = (withoutSource.dot(withoutSource) - residualEnergy)/signalEnergy
+            position = [round(float(positions[k][0]), 2), round(float(positions[k][1]), 2), round(float(positions[k][2]), 2)]
+            sources.append([position, float(strengths[k]), float(confidence)])
+
+        sources.sort(key=lambda source: source[2], reverse=True)
+        return sources
+
+    #Jointly refine the (K,3) source positions and (K,) strengths off the grid with damped Gauss-Newton (Levenberg-Marquardt) steps
+    def refineSources(self, positions, strengths, signalArray, iterations=REFINE_ITERATIONS):
+        roomBounds = np.array([self.room.x, self.room.y, self.room.z], dtype=float)
+        numSources = len(positions)
+        damping = 1e-3
+
+        def getResidual(positions, strengths):
+            return self.getAtoms(positions).T.dot(strengths) - signalArray
+
+        residual = getResidual(positions, strengths)
+        for _ in range(0, iterations):
+            #Derivatives of every microphone volume with respect to each source's strength and position
+            offsets = positions[:, None, :] - self.micPositions[None, :, :]
+            distances = np.maximum(np.sqrt((offsets*offsets).sum(axis=2)), self.gridSpacing/4)
+            strengthColumns = (self.sensitivities/distances).T
+            positionColumns = -(self.sensitivities*strengths[:, None]/distances**3)[:, :, None]*offsets
+            jacobian = np.hstack([strengthColumns, positionColumns.transpose(1, 0, 2).reshape(len(signalArray), 3*numSources)])
+
+            normal = jacobian.T.dot(jacobian)
+            gradient = jacobian.T.dot(residual)
+            step = np.linalg.solve(normal + damping*np.diag(np.diag(normal) + 1e-12), -gradient)
+            newStrengths = np.maximum(strengths + step[0:numSources], 0)
+            newPositions = np.clip(positions + step[numSources:].reshape(numSources, 3), 0, roomBounds)
+
+            newResidual = getResidual(newPositions, newStrengths)
+            if newResidual.dot(newResidual) < residual.dot(residual):
+                positions, strengths, residual = newPositions, newStrengths, newResidual
+                damping = max(damping/10, 1e-9)
+            else:
+                damping *= 10
+                if damping > 1e6:
+                    break
+        return positions, strengths
+
+    #Finer grid of positions within one candidate grid step of a point, limited to the inside of the room
+    def getLocalGrid(self, position):
+        steps = np.arange(-REFINE_FACTOR, REFINE_FACTOR + 1)*(self.gridSpacing/REFINE_FACTOR)
+        grid = np.stack(np.meshgrid(steps, steps, steps, indexing='ij'), axis=-1).reshape(-1, 3) + position
+        inside = ((grid >= 0) & (grid <= [self.room.x, self.room.y, self.room.z])).all(axis=1)
+        return grid[inside]
+
+#Reduction in least-squares residual energy from adding each of the (V,N) candidate atoms to the (K,N) other atoms
+#Candidates that would need a negative strength score zero
+def getJointFitScores(candidateAtoms, otherAtoms, signalArray):
+    residual = signalArray
+    if len(otherAtoms):
+        basis = np.linalg.qr(np.asarray(otherAtoms).T)[0]
+        residual = signalArray - basis.dot(basis.T.dot(signalArray))
+        candidateAtoms = candidateAtoms - candidateAtoms.dot(basis).dot(basis.T)
+
+    projections = candidateAtoms.dot(residual)
+    norms = (candidateAtoms*candidateAtoms).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where((projections > 0) & (norms > 0), projections*projections/norms, 0)
+    return scores
+
+#Least-squares source strengths for the (N,K) atom columns, constrained to be non-negative by dropping sources that fit negative
+def fitStrengths(atomMatrix, signalArray):
+    strengths = np.zeros(atomMatrix.shape[1])
+    active = np.ones(atomMatrix.shape[1], dtype=bool)
+    while active.any():
+        solution = np.linalg.lstsq(atomMatrix[:, active], signalArray, rcond=None)[0]
+        if (solution >= 0).all():
+            strengths[active] = solution
+            break
+        active[np.flatnonzero(active)[solution < 0]] = False
+    return strengths
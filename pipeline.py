@@ -0,0 +1,126 @@
+#Headless room -> microphones -> DSP -> localize -> camera heading pipeline, with no GUI or plotting imports
+import logging
+
+import numpy as np
+import helpers
+from room import Room
+from microphoneBank import MicrophoneBank
+from dsp import createDSP
+from cameraController import CameraController
+
+logger = logging.getLogger(__name__)
+
+#Number of microphone ports on the DSP unit
+DSP_PORTS = 99
+
+#Scenario fields and their defaults, matching the defaults of the Tk form in main.py
+SCENARIO_DEFAULTS = {
+    "roomDimensions": [10, 10, 5],
+    "microphoneSensitivity": 10,
+    "signalPosition": [6, 6, 2],
+    "signalStrength": 3,
+    "micGrid": [3, 3],
+    "gridOffset": 5,
+    "gridHeight": 5,
+    "cameraPosition": [0, 0, 2],
+    "mode": "triples"
+}
+VECTOR_FIELDS = ["roomDimensions", "signalPosition", "micGrid", "cameraPosition"]
+NUMBER_FIELDS = ["microphoneSensitivity", "signalStrength", "gridOffset", "gridHeight"]
+INTEGER_FIELDS = ["numPorts"]
+
+#Convert "1, 2, 3", "1 2 3" or [1, 2, 3] into a list of floats
+def parseVector(value):
+    if isinstance(value, str):
+        return [float(entry) for entry in value.replace(",", " ").split()]
+    return [float(entry) for entry in value]
+
+#Fill in defaults and normalize the types of a scenario read from the command line or a file
+#Fields without a default are passed through untouched, and only the fields present are normalized
+def normalizeScenario(scenario, defaults=SCENARIO_DEFAULTS):
+    normalized = dict(defaults)
+    normalized.update({key: value for key, value in scenario.items() if value not in (None, "")})
+    for field in VECTOR_FIELDS:
+        if field in normalized:
+            normalized[field] = parseVector(normalized[field])
+    for field in NUMBER_FIELDS:
+        if field in normalized:
+            normalized[field] = float(normalized[field])
+    for field in INTEGER_FIELDS:
+        if field in normalized:
+            normalized[field] = int(normalized[field])
+    if "micGrid" in normalized:
+        normalized["micGrid"] = [int(value) for value in normalized["micGrid"]]
+    return normalized
+
+#Parse "x,y,z" command line dimensions into a list of floats
+def parseDimensions(text):
+    return parseVector(text)
+
+#Parse an "XxY" command line microphone grid into a list of ints
+def parseGrid(text):
+    return [int(value) for value in text.lower().split("x")]
+
+#Set up the room, microphone grid, DSP and camera controller for a scenario
+#Returns the microphone bank and camera controller, or None when something falls outside the room
+def setupScenario(roomDimensions, microphoneSensitivity, micGrid, gridOffset, gridHeight, camPos, mode="triples", numPorts=DSP_PORTS):
+    # Define room
+    room = Room(roomDimensions[0], roomDimensions[1], roomDimensions[2])
+
+    # Create a microphone array
+    microphonePositions = helpers.generateMicArray(int(micGrid[0]), int(micGrid[1]), gridOffset, gridHeight)
+    if not helpers.allInRoom(microphonePositions, room):
+        logger.error("Some microphones fell outside the boundaries of the room, please re-enter data.")
+        return
+
+    # Set up microphone bank and DSP, large arrays are split across several DSP units
+    microphoneBank = MicrophoneBank(microphonePositions, microphoneSensitivity)
+    dsp = createDSP(numPorts, microphoneBank)
+
+    # Set up camera controller
+    if not helpers.allInRoom([camPos], room):
+        logger.error("The camera fell outside the boundaries of the room, please re-enter data.")
+        return
+    cameraOrientation = [0, 0]  # pointing along x-axis in degrees
+    cameraController = CameraController(camPos, cameraOrientation, dsp, room)
+    cameraController.setMicSensitivity(microphoneSensitivity)
+    cameraController.setLocalizationMode(mode)
+    cameraController.setMicPositions(microphonePositions)
+
+    return microphoneBank, cameraController
+
+#Run a single scenario end to end: broadcast the signal, localize it and point the camera at it
+#Returns a JSON serializable result and the camera controller, or None when the scenario is invalid
+def runScenario(roomDimensions, microphoneSensitivity, signalPos, sigStrength, micGrid, gridOffset, gridHeight, camPos, mode="triples"):
+    scenario = setupScenario(roomDimensions, microphoneSensitivity, micGrid, gridOffset, gridHeight, camPos, mode)
+    if scenario is None:
+        return
+    microphoneBank, cameraController = scenario
+
+    # Define Signal parameters
+    if not helpers.allInRoom([signalPos], cameraController.room):
+        logger.error("The signal fell outside the boundaries of the room, please re-enter data.")
+        return
+
+    # Send signal to all microphones
+    microphoneBank.sendSignal(signalPos, sigStrength)
+    logger.info(
+        "-> Audio signal at position x: {0}, y: {1}, z: {2} with strength {3} broadcast to all microphones".format(
+            signalPos[0], signalPos[1], signalPos[2], sigStrength))
+
+    # Predict signal location and point the camera at it
+    predictedSignalLocation = cameraController.getSignalPosition(sigStrength)
+    result = {
+        "predicted": predictedSignalLocation,
+        "actual": [float(value) for value in signalPos],
+        "mode": mode,
+        "residual": cameraController.getResidual(),
+        "localizationError": None,
+        "heading": None
+    }
+    if predictedSignalLocation:
+        cameraController.rePositionCamera(predictedSignalLocation)
+        result["localizationError"] = float(np.linalg.norm(np.subtract(predictedSignalLocation, signalPos)))
+        result["heading"] = [float(angle) for angle in cameraController.orientation]
+
+    return result, cameraController
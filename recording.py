@@ -0,0 +1,207 @@
+#Binary recording and replay of microphone capture sessions
+#A session file is a fixed header (magic, version, microphone count, room, frame interval, microphone positions and
+#sensitivities) padded to a 64 byte boundary, followed by one little-endian float32 block of volumes per frame
+#Frames are only ever appended, so a session can be read while it is still being recorded
+#Record a simulated session:  python recording.py record session.slrec --frames 100000
+#Replay it:  python recording.py replay session.slrec --mode multilateration
+import argparse
+import os
+import struct
+import time
+
+import numpy as np
+from room import Room
+from microphoneBank import MicrophoneBank
+from dsp import DSP
+from cameraController import CameraController, LOCALIZATION_MODES
+from calibration import CalibrationProfile
+from signalStream import localizeStream, DEFAULT_BATCH_SIZE
+from pipeline import parseDimensions
+
+#Identifies session files, and the version of the header layout they were written with
+RECORDING_MAGIC = b"SLREC\x00\x00\x00"
+RECORDING_VERSION = 1
+
+#Magic, version, microphone count, header size, room dimensions and frame interval
+HEADER_FORMAT = "<8sIII4x4d"
+HEADER_ALIGNMENT = 64
+
+FRAME_DTYPE = np.dtype("<f4")
+
+#Build the header of a session file, padded so frames start on an aligned offset
+def packHeader(micPositions, sensitivities, roomDimensions, frameInterval):
+    numMics = len(micPositions)
+    fixedSize = struct.calcsize(HEADER_FORMAT) + numMics*4*8
+    headerSize = -(-fixedSize//HEADER_ALIGNMENT)*HEADER_ALIGNMENT
+    header = struct.pack(HEADER_FORMAT, RECORDING_MAGIC, RECORDING_VERSION, numMics, headerSize,
+                         roomDimensions[0], roomDimensions[1], roomDimensions[2], frameInterval)
+    header += np.asarray(micPositions, dtype="<f8").tobytes() + np.asarray(sensitivities, dtype="<f8").tobytes()
+    return header + bytes(headerSize - len(header))
+
+#Read the header of a session file, returning a dict of its fields
+def unpackHeader(path):
+    with open(path, "rb") as sessionFile:
+        fixed = sessionFile.read(struct.calcsize(HEADER_FORMAT))
+        if len(fixed) < struct.calcsize(HEADER_FORMAT) or fixed[0:8] != RECORDING_MAGIC:
+            raise ValueError("{0} is not a session recording".format(path))
+        magic, version, numMics, headerSize, roomX, roomY, roomZ, frameInterval = struct.unpack(HEADER_FORMAT, fixed)
+        if version != RECORDING_VERSION:
+            raise ValueError("Unsupported session recording version {0} in {1}".format(version, path))
+        micPositions = np.frombuffer(sessionFile.read(numMics*3*8), dtype="<f8").reshape(numMics, 3)
+        sensitivities = np.frombuffer(sessionFile.read(numMics*8), dtype="<f8")
+    return {
+        "numMics": numMics,
+        "headerSize": headerSize,
+        "roomDimensions": [roomX, roomY, roomZ],
+        "frameInterval": frameInterval,
+        "micPositions": micPositions,
+        "sensitivities": sensitivities
+    }
+
+#Class to append frames of microphone volumes to a session file
+#Opening an existing session with the same layout continues it rather than starting over
+class SessionRecorder:
+    def __init__(self, path, micPositions, sensitivities, roomDimensions, frameInterval=0.0):
+        micPositions = np.asarray(micPositions, dtype=float).reshape(-1, 3)
+        sensitivities = np.broadcast_to(np.asarray(sensitivities, dtype=float), (len(micPositions),))
+        header = packHeader(micPositions, sensitivities, roomDimensions, frameInterval)
+        self.path = path
+        self.numMics = len(micPositions)
+        self.frameBytes = self.numMics*FRAME_DTYPE.itemsize
+
+        #Only a missing or empty file is started afresh, anything else must be a session with this exact header
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as sessionFile:
+                if sessionFile.read(len(header)) != header:
+                    raise ValueError("{0} is not a session recorded with this layout, room and frame interval".format(path))
+            self.file = open(path, "r+b")
+
+            #Drop a partial frame left behind by an interrupted recording
+            frameCount = (os.path.getsize(path) - len(header))//self.frameBytes
+            self.file.truncate(len(header) + frameCount*self.frameBytes)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(header)
+            frameCount = 0
+        self.frameCount = frameCount
+
+    #Append one frame of volumes, or an (F,N) block of frames
+    def write(self, frames):
+        frames = np.ascontiguousarray(frames, dtype=FRAME_DTYPE).reshape(-1, self.numMics)
+        self.file.write(frames.tobytes())
+        self.frameCount += len(frames)
+
+    #Append the DSP's current volumes as a frame
+    def recordDSP(self, dsp):
+        self.write(np.asarray(dsp.pollSignals(), dtype=FRAME_DTYPE)[0:self.numMics])
+
+    #Push buffered frames to disk so readers can see them
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
+
+#Class to read a session file as a memory-mapped (frames, mics) float32 array, frames are paged in from disk as they are used
+class SessionReader:
+    def __init__(self, path):
+        header = unpackHeader(path)
+        self.path = path
+        self.numMics = header["numMics"]
+        self.roomDimensions = header["roomDimensions"]
+        self.frameInterval = header["frameInterval"]
+        self.micPositions = header["micPositions"]
+        self.sensitivities = header["sensitivities"]
+
+        #Only whole frames are mapped, so a session still being recorded can be read safely
+        frameCount = (os.path.getsize(path) - header["headerSize"])//(self.numMics*FRAME_DTYPE.itemsize)
+        if frameCount:
+            self.frames = np.memmap(path, dtype=FRAME_DTYPE, mode="r", offset=header["headerSize"], shape=(frameCount, self.numMics))
+        else:
+            self.frames = np.empty((0, self.numMics), dtype=FRAME_DTYPE)
+
+    #Return the number of frames in the session
+    def __len__(self):
+        return len(self.frames)
+
+    #Return a frame, or a block of frames for a slice, as a view into the file
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    #Build a microphone bank, DSP and camera controller matching the recorded layout
+    #The bank is left silent, replayed frames are handed straight to the controller
+    def createController(self, cameraPosition=None, mode="triples"):
+        room = Room(self.roomDimensions[0], self.roomDimensions[1], self.roomDimensions[2])
+        microphoneBank = MicrophoneBank(self.micPositions, self.sensitivities)
+        dsp = DSP(len(microphoneBank), microphoneBank)
+        if cameraPosition is None:
+            cameraPosition = [0, 0, room.z/2]
+        cameraController = CameraController(cameraPosition, [0, 0], dsp, room)
+        cameraController.setLocalizationMode(mode)
+        cameraController.setMicPositions(self.micPositions)
+        if np.all(self.sensitivities == self.sensitivities[0]):
+            cameraController.setMicSensitivity(float(self.sensitivities[0]))
+        else:
+            cameraController.setCalibration(CalibrationProfile(self.micPositions, self.sensitivities, self.sensitivities.mean()))
+        return cameraController
+
+    #Localize every recorded frame in order, yielding the predicted signal position and camera heading for each
+    def replay(self, cameraController, actualVolume, batchSize=DEFAULT_BATCH_SIZE):
+        return localizeStream(cameraController, self.frames, actualVolume, batchSize, self.frameInterval or None)
+
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Record simulated microphone sessions and replay them through the localizer.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="record a simulated signal circling the room")
+    record.add_argument("path", help="session file to write or extend")
+    record.add_argument("--room", type=parseDimensions, default=[10, 10, 5], help="room dimensions as x,y,z")
+    record.add_argument("--grid", type=parseDimensions, default=[6, 6], help="microphone grid as x,y")
+    record.add_argument("--spacing", type=float, default=1.0, help="microphone grid spacing")
+    record.add_argument("--sensitivity", type=float, default=10.0, help="microphone sensitivity")
+    record.add_argument("--strength", type=float, default=3.0, help="signal strength")
+    record.add_argument("--noise", type=float, default=0.0, help="relative volume noise level")
+    record.add_argument("--frames", type=int, default=10000, help="frames to record")
+    record.add_argument("--interval", type=float, default=0.05, help="seconds between frames")
+
+    replay = commands.add_parser("replay", help="localize every frame of a session")
+    replay.add_argument("path", help="session file to replay")
+    replay.add_argument("--strength", type=float, help="signal strength, solved for when omitted")
+    replay.add_argument("--mode", choices=LOCALIZATION_MODES, default="triples", help="localization mode")
+    replay.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE, help="frames localized per batch")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    arguments = parseArguments()
+    start = time.perf_counter()
+
+    if arguments.command == "record":
+        import helpers
+        from cameraService import SimulatedMicFeed, generateCircularPath
+
+        micPositions = helpers.generateMicArray(int(arguments.grid[0]), int(arguments.grid[1]), arguments.spacing, arguments.room[2])
+        microphoneBank = MicrophoneBank(micPositions, arguments.sensitivity)
+        feed = SimulatedMicFeed(microphoneBank, generateCircularPath(arguments.room, 360), arguments.strength, arguments.noise)
+        with SessionRecorder(arguments.path, micPositions, arguments.sensitivity, arguments.room, arguments.interval) as recorder:
+            for _ in range(0, arguments.frames):
+                feed.advance()
+                recorder.write(microphoneBank.getVolumes())
+            print("-> Recorded {0} frames, {1} in total, to {2} in {3:.1f} s".format(arguments.frames, recorder.frameCount, arguments.path,
+                                                                                 time.perf_counter() - start))
+    else:
+        session = SessionReader(arguments.path)
+        cameraController = session.createController(mode=arguments.mode)
+        fixes = 0
+        for predictedSignalLocation, heading in session.replay(cameraController, arguments.strength, arguments.batch):
+            if predictedSignalLocation:
+                fixes += 1
+        elapsed = time.perf_counter() - start
+        print("-> Replayed {0} frames, {1} fixes, in {2:.1f} s ({3:.0f} frames/s)".format(len(session), fixes, elapsed, len(session)/elapsed))
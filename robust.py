@@ -0,0 +1,129 @@
+import numpy as np
+import helpers
+
+#Maximum number of microphone triples sampled per fix, which caps the cost of a fix however large the array grows
+DEFAULT_RANSAC_SAMPLES = 200
+
+#A microphone agrees with a candidate position when its sphere misses it by no more than this fraction of the sphere radius,
+#volume errors scale the radius, so the tolerance does too
+DEFAULT_INLIER_TOLERANCE = 0.05
+
+#Smallest inlier tolerance in distance units, so microphones right next to the signal are not held to an impossible standard
+MIN_INLIER_DISTANCE = 0.02
+
+#Fewest agreeing microphones accepted as a consensus, three spheres always agree with their own intersection
+MIN_INLIERS = 4
+
+#Fewest agreeing microphones accepted when the signal strength is solved for as well, the joint solve fits any five microphones
+#exactly, so it takes a sixth before agreement means anything
+MIN_JOINT_INLIERS = 6
+
+#Gauss-Newton iterations used to refine the consensus position on its inliers
+REFINE_ITERATIONS = 5
+
+#Random microphone samples solved for position and strength together when the strength is unknown, and the sample size,
+#the fewest microphones the joint solve works with
+DEFAULT_JOINT_SAMPLES = 30
+JOINT_SAMPLE_SIZE = 5
+
+#Fixed seed so the same frame always samples the same triples and replays are deterministic
+RANSAC_SEED = 0
+
+#Localize a signal from sphere radii some of which may be wrong, by sampling microphone triples and keeping the intersection
+#that the most spheres agree with (scored by truncated squared error, as in MSAC), then refining it on the agreeing spheres only
+#Radii that are not finite and positive, such as those from dead microphones, are never sampled and count as outliers
+#Returns the position, the (N,) inlier mask and the root mean square residual over the inliers, or None when there is no consensus
+def ransacLocalize(layout, sphereRadii, room, samples=DEFAULT_RANSAC_SAMPLES, inlierTolerance=DEFAULT_INLIER_TOLERANCE):
+    centers = layout.positions
+    sphereRadii = np.asarray(sphereRadii, dtype=float)
+    usable = np.isfinite(sphereRadii) & (sphereRadii > 0)
+    if usable.sum() < MIN_INLIERS:
+        return None
+
+    #Sample the layout's well-conditioned triples, keeping those that only use microphones with usable readings
+    rng = np.random.default_rng(RANSAC_SEED)
+    candidateTriples = sampleIndices(len(layout.triples), samples, rng)
+    candidateTriples = candidateTriples[usable[layout.triples[candidateTriples]].all(axis=1)]
+
+    #When many microphones are unusable most samples are wasted, so sample again from only the triples that avoid them
+    if len(candidateTriples) < samples//2 and len(layout.triples) > samples:
+        candidateTriples = np.flatnonzero(usable[layout.triples].all(axis=1))
+        candidateTriples = candidateTriples[sampleIndices(len(candidateTriples), samples, rng)]
+    if not len(candidateTriples):
+        return None
+    basis = {key: value[..., candidateTriples] for key, value in layout.trilaterationBasis.items()}
+    lowerPoints, upperPoints, valid = helpers.trilaterateBatch(centers, np.where(usable, sphereRadii, 0), basis=basis)
+
+    #Both intersections of every sampled triple are hypotheses, noise can push an intersection near a wall just outside the room
+    #so hypotheses are clamped to the room rather than dropped
+    candidates = np.concatenate([lowerPoints[valid], upperPoints[valid]])
+    if not len(candidates):
+        return None
+    roomBounds = np.array([room.x, room.y, room.z], dtype=float)
+    candidates = np.clip(candidates, 0, roomBounds)
+
+    #Score every hypothesis against every usable sphere at once, expanding |c - P|^2 = |c|^2 - 2c.P + |P|^2 so the bulk of the
+    #work is a single matrix product rather than a (hypotheses, mics, 3) array of offsets
+    usableCenters = centers[usable]
+    usableRadii = sphereRadii[usable]
+    tolerance = np.maximum(inlierTolerance*usableRadii, MIN_INLIER_DISTANCE)
+    squaredDistances = (candidates*candidates).sum(axis=1)[:, None] - 2*candidates.dot(usableCenters.T) + (usableCenters*usableCenters).sum(axis=1)
+    errors = np.abs(np.sqrt(np.maximum(squaredDistances, 0)) - usableRadii)/tolerance
+    costs = np.minimum(errors*errors, 1).sum(axis=1)
+    point = candidates[int(np.argmin(costs))]
+
+    #Refine on the inliers, then recount them at the refined position and refine once more if they changed
+    usableIndices = np.flatnonzero(usable)
+    inliers = getInliers(usableCenters, usableRadii, tolerance, point)
+    for _ in range(0, 2):
+        if inliers.sum() < MIN_INLIERS:
+            return None
+        point = helpers.refineMultilateration(usableCenters[inliers], usableRadii[inliers], point, REFINE_ITERATIONS)[0]
+
+        #A signal level with a planar array can refine through the array to its mirror image, which is held to the room as well
+        point = np.clip(point, 0, roomBounds)
+        refinedInliers = getInliers(usableCenters, usableRadii, tolerance, point)
+        if np.array_equal(refinedInliers, inliers):
+            break
+        inliers = refinedInliers
+    if inliers.sum() < MIN_INLIERS:
+        return None
+
+    inlierMask = np.zeros(len(sphereRadii), dtype=bool)
+    inlierMask[usableIndices[inliers]] = True
+    return point, inlierMask, helpers.getSphereResidual(usableCenters[inliers], usableRadii[inliers], point)
+
+#Mask of the spheres that pass within their tolerance of a point
+def getInliers(centers, radii, tolerance, point):
+    return np.abs(np.sqrt(((centers - point)**2).sum(axis=1)) - radii) <= tolerance
+
+#Up to count distinct indices below size in ascending order, drawn with replacement so the cost does not grow with size
+def sampleIndices(size, count, rng):
+    if size <= count:
+        return np.arange(size)
+    return np.unique(rng.integers(0, size, count))
+
+#Estimate the position and strength of a signal from distance ratios some of which may be wrong, by solving jointly for both on
+#random five microphone samples and keeping the solution the most spheres agree with, scored as in ransacLocalize
+#The strength only scales the spheres, so this estimate is good enough to run ransacLocalize at, which then finds the outliers
+#Returns the position and strength, or None when no sample gives a solution inside the room
+def sampleJointSolution(centers, distanceRatios, room, samples=DEFAULT_JOINT_SAMPLES, inlierTolerance=DEFAULT_INLIER_TOLERANCE):
+    if len(centers) < MIN_JOINT_INLIERS:
+        return None
+    rng = np.random.default_rng(RANSAC_SEED)
+    subsets = np.argsort(rng.random((samples, len(centers))), axis=1)[:, 0:JOINT_SAMPLE_SIZE]
+    roomBounds = np.array([room.x, room.y, room.z], dtype=float)
+
+    best = None
+    bestCost = np.inf
+    for subset in subsets:
+        #Both solutions of a planar sample are hypotheses, the refinement is left to the solve on the final inliers
+        for point, strength, _ in helpers.solvePositionAndStrength(centers[subset], distanceRatios[subset], 0):
+            if strength <= 0 or not ((point >= 0) & (point <= roomBounds)).all():
+                continue
+            radii = strength*distanceRatios
+            errors = np.abs(np.sqrt(((centers - point)**2).sum(axis=1)) - radii)/np.maximum(inlierTolerance*radii, MIN_INLIER_DISTANCE)
+            cost = np.minimum(errors*errors, 1).sum()
+            if cost < bestCost:
+                best, bestCost = (point, strength), cost
+    return best
@@ -1,3 +1,7 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
 #Class to represent a Room object
 class Room:
 
@@ -6,4 +10,4 @@ class Room:
         self.y = y
         self.z = z
 
-        print("-> Room generated with dimensions x: {0}, y: {1}, z: {2}".format(x, y, z))
\ No newline at end of file
+        logger.info("-> Room generated with dimensions x: {0}, y: {1}, z: {2}".format(x, y, z))
\ No newline at end of file
@@ -0,0 +1,88 @@
+import time
+
+import numpy as np
+
+#Number of frames copied out of the source together before they are localized
+DEFAULT_BATCH_SIZE = 64
+
+#Class to represent a fixed size ring buffer of microphone frames, the oldest frames are overwritten when it is full
+class FrameBuffer:
+    def __init__(self, capacity, numMics):
+        self.frames = np.zeros((capacity, numMics))
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+        self.droppedFrames = 0
+
+    #Add a frame of microphone volumes to the buffer
+    def push(self, frame):
+        end = (self.start + self.size) % self.capacity
+        self.frames[end] = frame
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+            self.droppedFrames += 1
+        else:
+            self.size += 1
+
+    #Remove and return the oldest frame in the buffer
+    def pop(self):
+        if not self.size:
+            return None
+        frame = self.frames[self.start].copy()
+        self.start = (self.start + 1) % self.capacity
+        self.size -= 1
+        return frame
+
+    #Yield buffered frames oldest first until the buffer is empty
+    def drain(self):
+        while self.size:
+            yield self.pop()
+
+    #Iterating a buffer drains it, so a buffer can be passed straight to localizeStream
+    def __iter__(self):
+        return self.drain()
+
+    #Return the number of frames waiting in the buffer
+    def __len__(self):
+        return self.size
+
+#Yield a snapshot of the DSP signal array for every poll, for use as a live frame source
+def pollFrames(dsp, numFrames=None):
+    count = 0
+    while numFrames is None or count < numFrames:
+        yield np.array(dsp.pollSignals(), dtype=float)
+        count += 1
+
+#Localize a stream of microphone frames, where frames is any iterable of per-frame volume vectors such as a (frames, mics) array,
+#a FrameBuffer or pollFrames over a live DSP
+#Arrays (including memory-mapped recordings) are copied into one reusable (batchSize, mics) block at a time, so memory stays bounded
+#however long the recording is, while frames from any other source are localized as soon as they are pulled so a live source
+#is not held back waiting for a batch to fill
+#Frames from a live source are timestamped as they are pulled, recorded frames are taken to be frameInterval seconds apart
+#when it is given, so tracking mode advances the track by the real time between frames
+#Yields the predicted signal position and camera heading for each frame, the heading is None when no position could be found
+def localizeStream(cameraController, frames, actualVolume, batchSize=DEFAULT_BATCH_SIZE, frameInterval=None):
+    numMics = cameraController.dsp.getNumActiveMics()
+    if not isinstance(frames, np.ndarray):
+        for frame in frames:
+            yield localizeFrame(cameraController, np.asarray(frame, dtype=float)[0:numMics], actualVolume, time.perf_counter())
+        return
+
+    batch = np.empty((batchSize, numMics))
+    for framePosition in range(0, len(frames), batchSize):
+        block = frames[framePosition:framePosition + batchSize, 0:numMics]
+        batchCount = len(block)
+        batch[0:batchCount] = block
+        for offset, signalArray in enumerate(batch[0:batchCount]):
+            timestamp = None if frameInterval is None else (framePosition + offset)*frameInterval
+            yield localizeFrame(cameraController, signalArray, actualVolume, timestamp)
+
+#Localize one frame and point the camera at it, returning the predicted signal position and camera heading
+#timestamp is the time the frame was captured in seconds, see CameraController.getSignalPosition
+def localizeFrame(cameraController, signalArray, actualVolume, timestamp=None):
+    predictedSignalLocation = cameraController.getSignalPosition(actualVolume, signalArray, timestamp)
+    heading = None
+    if predictedSignalLocation:
+        cameraController.rePositionCamera(predictedSignalLocation, verbose=False)
+        heading = cameraController.orientation
+    return predictedSignalLocation, heading
@@ -0,0 +1,100 @@
+import numpy as np
+import helpers
+
+#Default fastest pan and tilt slew rates of a camera in degrees per second
+DEFAULT_MAX_PAN_RATE = 90.0
+DEFAULT_MAX_TILT_RATE = 60.0
+
+#Default smallest change in heading worth commanding, in degrees, smaller changes leave the camera where it is
+DEFAULT_DEADBAND = 1.0
+
+#Seconds of slewing a camera is willing to trade for each metre closer it is to a source when sources are assigned
+DISTANCE_WEIGHT = 0.1
+
+#Class to represent the cameras in a room, steered together towards any number of sources
+#Headings for every camera and source are computed in one pass, each source is given to the camera that can get on to it soonest,
+#and commands are rate limited and held back inside a deadband so the motors are not driven by every small change in a fix
+class CameraRig:
+    def __init__(self, cameraPositions, orientations=None, maxPanRate=DEFAULT_MAX_PAN_RATE, maxTiltRate=DEFAULT_MAX_TILT_RATE,
+                 deadband=DEFAULT_DEADBAND):
+        self.positions = np.asarray(cameraPositions, dtype=float).reshape(-1, 3)
+        if orientations is None:
+            self.orientations = np.zeros((len(self.positions), 2))
+        else:
+            self.orientations = np.array(orientations, dtype=float).reshape(-1, 2)
+        self.maxPanRate = maxPanRate
+        self.maxTiltRate = maxTiltRate
+        self.deadband = deadband
+        self.commandCount = 0
+
+    #Build a rig around the camera of a controller, so its heading can be rate limited
+    @classmethod
+    def fromController(cls, cameraController, maxPanRate=DEFAULT_MAX_PAN_RATE, maxTiltRate=DEFAULT_MAX_TILT_RATE, deadband=DEFAULT_DEADBAND):
+        return cls([cameraController.position], [cameraController.orientation], maxPanRate, maxTiltRate, deadband)
+
+    #Pan and tilt from every camera to every one of the (S,3) source positions, as two (C,S) arrays in degrees
+    def getHeadings(self, sourcePositions):
+        sourcePositions = np.asarray(sourcePositions, dtype=float).reshape(-1, 3)
+        return helpers.getPanTilt(self.positions[:, None, :], sourcePositions[None, :, :])
+
+    #Seconds each camera needs to slew from its current orientation on to each of the (C,S) headings
+    def getSlewTimes(self, pan, tilt):
+        panChange, tiltChange = getHeadingChanges(self.orientations[:, None, :], pan, tilt)
+        return np.maximum(np.abs(panChange)/self.maxPanRate, np.abs(tiltChange)/self.maxTiltRate)
+
+    #Give each source the camera that can get on to it soonest, favouring closer cameras, with one source per camera
+    #Sources are taken in the order given, so list the most important first, such as getSignalPositions' most confident first
+    #Returns a (S,) array of camera indices, -1 for sources left over when there are more sources than cameras
+    def assignSources(self, sourcePositions):
+        sourcePositions = np.asarray(sourcePositions, dtype=float).reshape(-1, 3)
+        assignment = np.full(len(sourcePositions), -1)
+        if not len(sourcePositions):
+            return assignment
+
+        pan, tilt = self.getHeadings(sourcePositions)
+        offsets = sourcePositions[None, :, :] - self.positions[:, None, :]
+        costs = self.getSlewTimes(pan, tilt) + DISTANCE_WEIGHT*np.sqrt((offsets*offsets).sum(axis=2))
+
+        freeCameras = np.ones(len(self.positions), dtype=bool)
+        for source in range(0, len(sourcePositions)):
+            if not freeCameras.any():
+                break
+            camera = int(np.argmin(np.where(freeCameras, costs[:, source], np.inf)))
+            assignment[source] = camera
+            freeCameras[camera] = False
+        return assignment
+
+    #Move the cameras dt seconds closer to their assigned sources and return the commands that were issued
+    #A camera only moves when its heading is off by more than the deadband, and then by no more than its slew rates allow
+    #Cameras without a source hold their orientation
+    #Returns a list of {"camera", "source", "pan", "tilt"} commands, one per camera that moved
+    def steer(self, sourcePositions, dt):
+        sourcePositions = np.asarray(sourcePositions, dtype=float).reshape(-1, 3)
+        assignment = self.assignSources(sourcePositions)
+        sources = np.flatnonzero(assignment >= 0)
+        if not len(sources):
+            return []
+        cameras = assignment[sources]
+
+        pan, tilt = helpers.getPanTilt(self.positions[cameras], sourcePositions[sources])
+        panChange, tiltChange = getHeadingChanges(self.orientations[cameras], pan, tilt)
+
+        moving = (np.abs(panChange) > self.deadband) | (np.abs(tiltChange) > self.deadband)
+        panChange = np.clip(panChange, -self.maxPanRate*dt, self.maxPanRate*dt)
+        tiltChange = np.clip(tiltChange, -self.maxTiltRate*dt, self.maxTiltRate*dt)
+
+        commands = []
+        for k in np.flatnonzero(moving):
+            camera = int(cameras[k])
+            newPan = (self.orientations[camera, 0] + panChange[k] + 180) % 360 - 180
+            newTilt = self.orientations[camera, 1] + tiltChange[k]
+            self.orientations[camera] = [newPan, newTilt]
+            commands.append({"camera": camera, "source": int(sources[k]), "pan": float(newPan), "tilt": float(newTilt)})
+        self.commandCount += len(commands)
+        return commands
+
+#Signed change from (...,2) pan/tilt orientations to the given headings, with pan taking the short way round the circle
+def getHeadingChanges(orientations, pan, tilt):
+    panChange = (pan - orientations[..., 0] + 180) % 360 - 180
+    tiltChange = tilt - orientations[..., 1]
+    return panChange, tiltChange
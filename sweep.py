@@ -0,0 +1,195 @@
+#Parallel sweep runner for evaluating candidate microphone layouts over many signal positions
+#Run with: python sweep.py --room 10,10,5 --grids 3x3 6x6 10x10 --spacings 1 2 --signals 10000 --output sweep.jsonl
+import argparse
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+
+import numpy as np
+import helpers
+import instrumentation
+import pipeline
+from room import Room
+from microphoneBank import MicrophoneBank
+from dsp import DSP
+from cameraController import CameraController, LOCALIZATION_MODES
+
+#Number of signal positions handed to a worker in one task
+DEFAULT_CHUNK_SIZE = 256
+
+#Number of layouts each worker keeps attached and precomputed at once
+WORKER_LAYOUT_CACHE = 4
+
+#Layouts a worker process has attached to, keyed by shared memory block name
+workerLayouts = OrderedDict()
+
+#Attach to a microphone layout published in shared memory and build its controller, once per layout per worker process
+def getWorkerController(task):
+    name = task["sharedName"]
+    if name in workerLayouts:
+        workerLayouts.move_to_end(name)
+        return workerLayouts[name][1:]
+
+    sharedBlock = shared_memory.SharedMemory(name=name)
+    micPositions = np.ndarray(task["shape"], dtype=np.float64, buffer=sharedBlock.buf)
+    micPositions.flags.writeable = False
+
+    room = Room(task["roomDimensions"][0], task["roomDimensions"][1], task["roomDimensions"][2])
+    microphoneBank = MicrophoneBank(micPositions, task["microphoneSensitivity"])
+    dsp = DSP(len(microphoneBank), microphoneBank)
+    cameraController = CameraController([0, 0, 0], [0, 0], dsp, room)
+    cameraController.setMicSensitivity(task["microphoneSensitivity"])
+    cameraController.setLocalizationMode(task["mode"])
+    cameraController.setMicPositions(micPositions)
+
+    workerLayouts[name] = (sharedBlock, microphoneBank, cameraController)
+    if len(workerLayouts) > WORKER_LAYOUT_CACHE:
+        oldBlock = workerLayouts.popitem(last=False)[1][0]
+        oldBlock.close()
+    return microphoneBank, cameraController
+
+#Localize one chunk of signal positions against one layout, returning the localization error of each (NaN when no fix was found)
+def runChunk(task):
+    microphoneBank, cameraController = getWorkerController(task)
+    rng = np.random.default_rng(task["seed"])
+
+    start = time.perf_counter()
+    errors = np.full(len(task["signals"]), np.nan)
+    for index, signalPosition in enumerate(task["signals"]):
+        microphoneBank.sendSignal(signalPosition, task["signalStrength"])
+        if task["noise"]:
+            microphoneBank.volumes *= np.maximum(1 + task["noise"]*rng.standard_normal(len(microphoneBank)), 1e-3)
+        predictedSignalLocation = cameraController.getSignalPosition(task["signalStrength"])
+        if predictedSignalLocation:
+            errors[index] = np.linalg.norm(np.subtract(predictedSignalLocation, signalPosition))
+    return task["layoutIndex"], errors, time.perf_counter() - start
+
+#Summarize the localization errors of one layout once all of its chunks are back
+def summarizeLayout(layout, errors, solveSeconds):
+    found = errors[~np.isnan(errors)]
+    summary = dict(layout)
+    summary.update({
+        "microphones": layout["micGrid"][0]*layout["micGrid"][1],
+        "fixes": len(errors),
+        "failureRate": float(1 - len(found)/len(errors)) if len(errors) else 0.0,
+        "fixesPerSecond": float(len(errors)/solveSeconds) if solveSeconds else None,
+        "errorMeters": instrumentation.summarizeSamples(found, (50, 90))
+    })
+    return summary
+
+#Evaluate every layout against the same (S,3) signal positions across a process pool
+#Each layout's microphone positions are published once in shared memory rather than pickled into every task, tasks are
+#submitted in chunks with a bounded number in flight, and a summary is yielded for each layout as soon as it completes
+#A layout is a dict with roomDimensions, micGrid, gridOffset, gridHeight and microphoneSensitivity
+def runSweep(layouts, signals, signalStrength=3, noise=0, mode="triples", workers=None, chunkSize=DEFAULT_CHUNK_SIZE, seed=0):
+    signals = np.asarray(signals, dtype=float).reshape(-1, 3)
+    sharedBlocks = []
+    try:
+        #Publish the microphone layouts and queue their chunks
+        tasks = []
+        for layoutIndex, layout in enumerate(layouts):
+            micPositions = np.array(helpers.generateMicArray(int(layout["micGrid"][0]), int(layout["micGrid"][1]),
+                                                             layout["gridOffset"], layout["gridHeight"]), dtype=np.float64)
+            sharedBlock = shared_memory.SharedMemory(create=True, size=max(micPositions.nbytes, 1))
+            sharedBlocks.append(sharedBlock)
+            np.ndarray(micPositions.shape, dtype=np.float64, buffer=sharedBlock.buf)[:] = micPositions
+
+            for chunkStart in range(0, len(signals), chunkSize):
+                tasks.append({
+                    "layoutIndex": layoutIndex,
+                    "sharedName": sharedBlock.name,
+                    "shape": micPositions.shape,
+                    "roomDimensions": list(layout["roomDimensions"]),
+                    "microphoneSensitivity": layout["microphoneSensitivity"],
+                    "mode": mode,
+                    "signals": signals[chunkStart:chunkStart + chunkSize],
+                    "signalStrength": signalStrength,
+                    "noise": noise,
+                    "seed": [seed, layoutIndex, chunkStart]
+                })
+
+        remainingChunks = [0]*len(layouts)
+        for task in tasks:
+            remainingChunks[task["layoutIndex"]] += 1
+        layoutErrors = [[] for _ in layouts]
+        layoutSeconds = [0.0]*len(layouts)
+
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            maxInFlight = 2*workers
+            pendingTasks = iter(tasks)
+            inFlight = set()
+            while True:
+                for task in pendingTasks:
+                    inFlight.add(executor.submit(runChunk, task))
+                    if len(inFlight) >= maxInFlight:
+                        break
+                if not inFlight:
+                    break
+
+                done, inFlight = wait(inFlight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    layoutIndex, errors, seconds = future.result()
+                    layoutErrors[layoutIndex].append(errors)
+                    layoutSeconds[layoutIndex] += seconds
+                    remainingChunks[layoutIndex] -= 1
+                    if not remainingChunks[layoutIndex]:
+                        yield summarizeLayout(layouts[layoutIndex], np.concatenate(layoutErrors[layoutIndex]), layoutSeconds[layoutIndex])
+                        layoutErrors[layoutIndex] = None
+    finally:
+        for sharedBlock in sharedBlocks:
+            sharedBlock.close()
+            sharedBlock.unlink()
+
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Evaluate microphone layouts over many signal positions in parallel.")
+    parser.add_argument("--room", type=pipeline.parseDimensions, default=[10, 10, 5], help="room dimensions as x,y,z")
+    parser.add_argument("--grids", nargs="+", type=pipeline.parseGrid, default=[[3, 3], [6, 6]], help="microphone grids as XxY")
+    parser.add_argument("--spacings", nargs="+", type=float, default=[1.0, 2.0], help="microphone grid spacings")
+    parser.add_argument("--heights", nargs="+", type=float, help="microphone grid heights, defaults to the ceiling")
+    parser.add_argument("--sensitivity", type=float, default=10.0, help="microphone sensitivity")
+    parser.add_argument("--signals", type=int, default=1000, help="random signal positions per layout")
+    parser.add_argument("--strength", type=float, default=3.0, help="signal strength")
+    parser.add_argument("--noise", type=float, default=0.0, help="relative volume noise level")
+    parser.add_argument("--mode", choices=LOCALIZATION_MODES, default="triples", help="localization mode")
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to the number of cores")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK_SIZE, help="signal positions per task")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="write one JSON line per layout to this file")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    arguments = parseArguments()
+    room = Room(arguments.room[0], arguments.room[1], arguments.room[2])
+
+    #Candidate layouts are every grid, spacing and height combination that fits in the room
+    layouts = []
+    for micGrid in arguments.grids:
+        for gridOffset in arguments.spacings:
+            for gridHeight in arguments.heights or [arguments.room[2]]:
+                if not helpers.allInRoom([[(micGrid[0] - 1)*gridOffset, (micGrid[1] - 1)*gridOffset, gridHeight]], room):
+                    print("-> Skipping {0}x{1} grid with spacing {2}, it does not fit in the room".format(micGrid[0], micGrid[1], gridOffset))
+                    continue
+                layouts.append({"roomDimensions": arguments.room, "micGrid": micGrid, "gridOffset": gridOffset,
+                                "gridHeight": gridHeight, "microphoneSensitivity": arguments.sensitivity})
+
+    rng = np.random.default_rng(arguments.seed)
+    signals = rng.uniform([0.1, 0.1, 0.1], [arguments.room[0] - 0.1, arguments.room[1] - 0.1, arguments.room[2] - 0.5], size=(arguments.signals, 3))
+
+    outputFile = open(arguments.output, "w") if arguments.output else None
+    start = time.perf_counter()
+    try:
+        for summary in runSweep(layouts, signals, arguments.strength, arguments.noise, arguments.mode, arguments.workers, arguments.chunk, arguments.seed):
+            error = summary["errorMeters"]["p50"] if summary["errorMeters"] else float("nan")
+            print("-> {0}x{1} grid spacing {2} height {3}: median error {4:.3f} m, failures {5:.0%}"
+                  .format(summary["micGrid"][0], summary["micGrid"][1], summary["gridOffset"], summary["gridHeight"], error, summary["failureRate"]))
+            if outputFile:
+                outputFile.write(json.dumps(summary) + "\n")
+                outputFile.flush()
+    finally:
+        if outputFile:
+            outputFile.close()
+    print("-> Evaluated {0} layouts over {1} signal positions in {2:.1f} s".format(len(layouts), arguments.signals, time.perf_counter() - start))
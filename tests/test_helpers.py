@@ -0,0 +1,39 @@
+import itertools
+
+import numpy as np
+import pytest
+import helpers
+
+#Microphone layout with no collinear triples, so every triple can be trilaterated one at a time
+CENTERS = np.array([[1, 1, 5], [4, 1, 4.5], [1, 5, 4], [6, 6, 5], [3, 8, 3.5], [8, 2, 4]], dtype=float)
+
+#Signal position the sphere radii are measured from
+SIGNAL = np.array([3, 4, 1], dtype=float)
+
+#getTripleIndices must produce the same triples in the same order as itertools.combinations
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 4, 7, 12])
+def testTripleIndicesMatchCombinations(count):
+    expected = np.array(list(itertools.combinations(range(count), 3)), dtype=np.intp).reshape(-1, 3)
+    np.testing.assert_array_equal(helpers.getTripleIndices(count), expected)
+
+#trilaterateBatch must agree with trilaterate on every triple, both through its triples and its precomputed basis
+def testTrilaterateBatchMatchesTrilaterate():
+    radii = np.linalg.norm(CENTERS - SIGNAL, axis=1)
+    triples = helpers.getTripleIndices(len(CENTERS))
+    basis = helpers.getTrilaterationBasis(CENTERS, triples)
+
+    for pointsA, pointsB, valid in (helpers.trilaterateBatch(CENTERS, radii, triples), helpers.trilaterateBatch(CENTERS, radii, basis=basis)):
+        assert valid.all()
+        for index, (a, b, c) in enumerate(triples):
+            expectedA, expectedB = helpers.trilaterate(CENTERS[a], CENTERS[b], CENTERS[c], radii[a], radii[b], radii[c])
+            np.testing.assert_allclose(pointsA[index], expectedA, atol=1e-9)
+            np.testing.assert_allclose(pointsB[index], expectedB, atol=1e-9)
+
+#Triples whose spheres miss each other or whose microphones are collinear are masked out instead of raising
+def testTrilaterateBatchFlagsInvalidTriples():
+    centers = np.array([[0, 0, 0], [1, 0, 0], [2, 0, 0], [0, 1, 0]], dtype=float)
+    radii = np.array([0.1, 0.1, 0.1, 0.1])
+    with pytest.raises(Exception):
+        helpers.trilaterate(centers[0], centers[1], centers[3], radii[0], radii[1], radii[3])
+    _, _, valid = helpers.trilaterateBatch(centers, radii, [[0, 1, 2], [0, 1, 3]])
+    assert not valid.any()
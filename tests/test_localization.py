@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+import pipeline
+from cameraController import LOCALIZATION_MODES
+
+#Signal position and strength every mode must recover, kept below the height where a flat array sees a mirror image
+SIGNAL = [3, 4, 1]
+STRENGTH = 3
+
+#Set up a 4x4 grid of microphones in a 10x10x5 room, send the signal and return the camera controller
+def createScenario(mode):
+    microphoneBank, cameraController = pipeline.setupScenario([10, 10, 5], 10, [4, 4], 1, 4, [0, 0, 2], mode)
+    microphoneBank.sendSignal(SIGNAL, STRENGTH)
+    return cameraController
+
+#Every localization mode fixes a noise free signal at its known position
+@pytest.mark.parametrize("mode", LOCALIZATION_MODES)
+def testKnownPositionFix(mode):
+    cameraController = createScenario(mode)
+    predictedSignalLocation = cameraController.getSignalPosition(STRENGTH)
+    np.testing.assert_allclose(predictedSignalLocation, SIGNAL, atol=0.05)
+
+#The modes that can solve for the strength as well fix the signal when the strength is unknown
+@pytest.mark.parametrize("mode", ["triples", "robust"])
+def testUnknownStrengthFix(mode):
+    cameraController = createScenario(mode)
+    predictedSignalLocation = cameraController.getSignalPosition(None)
+    np.testing.assert_allclose(predictedSignalLocation, SIGNAL, atol=0.05)
+    assert cameraController.signalStrength == pytest.approx(STRENGTH, rel=0.01)
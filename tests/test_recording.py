@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import helpers
+from recording import SessionRecorder, SessionReader
+
+#A session written frame by frame and in blocks reads back with the same layout, room, interval and volumes
+def testSessionRoundTrip(tmp_path):
+    path = str(tmp_path/"session.bin")
+    micPositions = np.array(helpers.generateMicArray(3, 3, 2, 5), dtype=float)
+    sensitivities = np.linspace(9, 11, len(micPositions))
+    frames = np.random.default_rng(0).uniform(0.1, 5, (5, len(micPositions))).astype(np.float32)
+
+    with SessionRecorder(path, micPositions, sensitivities, [10, 10, 5], 0.05) as recorder:
+        recorder.write(frames[0])
+        recorder.write(frames[1:])
+
+    reader = SessionReader(path)
+    assert len(reader) == len(frames)
+    assert reader.numMics == len(micPositions)
+    assert reader.frameInterval == pytest.approx(0.05)
+    np.testing.assert_array_equal(reader.micPositions, micPositions)
+    np.testing.assert_array_equal(reader.sensitivities, sensitivities)
+    np.testing.assert_allclose(reader.roomDimensions, [10, 10, 5])
+    np.testing.assert_array_equal(reader[:], frames)
+
+#Reopening a session appends to it, and a session with a different layout is refused
+def testSessionAppendAndMismatch(tmp_path):
+    path = str(tmp_path/"session.bin")
+    micPositions = np.array(helpers.generateMicArray(3, 3, 2, 5), dtype=float)
+    frames = np.ones((2, len(micPositions)), dtype=np.float32)
+
+    for _ in range(2):
+        with SessionRecorder(path, micPositions, 10, [10, 10, 5]) as recorder:
+            recorder.write(frames)
+    assert len(SessionReader(path)) == 4
+
+    with pytest.raises(ValueError):
+        SessionRecorder(path, micPositions[1:], 10, [10, 10, 5])
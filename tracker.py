@@ -0,0 +1,171 @@
+import numpy as np
+import helpers
+import instrumentation
+
+#Number of microphones nearest the predicted position used to update a tracked signal
+DEFAULT_TRACKING_MICS = 12
+
+#Gauss-Newton iterations per tracked frame, a warm start from the last fix converges in a few
+TRACKING_ITERATIONS = 3
+
+#A tracked frame whose residual exceeds this multiple of the running residual is treated as a lost track and fully re-solved
+RESIDUAL_JUMP_FACTOR = 4
+
+#Residual below which a tracked frame is always accepted, so a near perfect track does not fall back on every small wobble
+MIN_RESIDUAL_THRESHOLD = 0.05
+
+#Weight of each new frame in the running residual
+RESIDUAL_SMOOTHING = 0.1
+
+#Weight of each new frame in the tracked strength of a signal of unknown strength
+STRENGTH_SMOOTHING = 0.1
+
+#A measurement further than this from the prediction, in squared standard deviations, means the signal jumped and the filter
+#restarts at the measurement instead of easing towards it (the 99.9% point of a chi-squared distribution with 3 degrees of freedom)
+INNOVATION_GATE = 16.27
+
+#Default time between frames in seconds, used when frames are not timestamped
+DEFAULT_FRAME_INTERVAL = 0.05
+
+#Class to follow a moving signal from frame to frame, keeping state between calls rather than solving each frame from scratch
+#Each frame refines the previous fix with a few Gauss-Newton steps over only the microphones nearest the predicted position,
+#optionally smoothed by a constant velocity Kalman filter, and falls back to a full solve when the fit suddenly gets worse
+class SignalTracker:
+    def __init__(self, cameraController, numMics=DEFAULT_TRACKING_MICS, useKalman=True, processNoise=1.0, measurementNoise=0.05,
+                 frameInterval=DEFAULT_FRAME_INTERVAL):
+        self.cameraController = cameraController
+        self.numMics = numMics
+        self.useKalman = useKalman
+        self.processNoise = processNoise
+        self.measurementNoise = measurementNoise
+        self.frameInterval = frameInterval
+
+        self.fullSolves = 0
+        self.trackedFrames = 0
+        self.reset()
+
+    #Forget the current track, the next frame is fully solved
+    def reset(self):
+        self.state = None
+        self.covariance = None
+        self.strength = None
+        self.runningResidual = None
+        self.lastTimestamp = None
+
+    #Return whether a signal is currently being tracked
+    def isTracking(self):
+        return self.state is not None
+
+    #Predict where the signal is in the next frame, dt seconds on from the last one
+    def predict(self, dt):
+        if not self.useKalman:
+            return self.state[0:3]
+
+        transition = getTransitionMatrix(dt)
+        self.state = transition.dot(self.state)
+        self.covariance = transition.dot(self.covariance).dot(transition.T) + getProcessCovariance(dt, self.processNoise)
+        return self.state[0:3]
+
+    #Fold a measured position into the track, returning the filtered position
+    def correct(self, measurement):
+        if not self.useKalman:
+            self.state = measurement
+            return measurement
+
+        #The measurement observes the position part of the (x, y, z, vx, vy, vz) state directly
+        innovation = measurement - self.state[0:3]
+        innovationCovariance = self.covariance[0:3, 0:3] + self.measurementNoise*self.measurementNoise*np.eye(3)
+        if innovation.dot(np.linalg.solve(innovationCovariance, innovation)) > INNOVATION_GATE:
+            self.startFilter(measurement)
+            return measurement
+
+        gain = np.linalg.solve(innovationCovariance, self.covariance[0:3, :]).T
+        self.state = self.state + gain.dot(innovation)
+        self.covariance = self.covariance - gain.dot(self.covariance[0:3, :])
+        return self.state[0:3]
+
+    #Restart the filter at a position with an unknown velocity
+    def startFilter(self, position):
+        if not self.useKalman:
+            self.state = position
+            return
+        self.state = np.concatenate([position, np.zeros(3)])
+        self.covariance = np.diag([self.measurementNoise**2]*3 + [(self.processNoise*self.frameInterval)**2]*3)
+
+    #Start a new track from a full solve of the frame
+    def startTrack(self, actualVolume, signalArray, timestamp):
+        self.fullSolves += 1
+        instrumentation.count("fullSolves")
+        predictedSignalLocation = self.cameraController.solveSignalPosition(actualVolume, signalArray)
+        if not predictedSignalLocation:
+            self.reset()
+            return []
+
+        self.startFilter(np.array(predictedSignalLocation, dtype=float))
+        self.strength = self.cameraController.signalStrength
+        self.runningResidual = self.cameraController.residual or 0
+        self.lastTimestamp = timestamp
+        return predictedSignalLocation
+
+    #Localize the signal in a frame of volumes, polling the DSP unless one is supplied, continuing the current track when there is one
+    #timestamp is the frame time in seconds, frames are assumed to be frameInterval apart when it is not given
+    #Returns the predicted signal location like CameraController.getSignalPosition, filtered when the Kalman filter is on
+    def update(self, actualVolume, signalArray=None, timestamp=None):
+        if signalArray is None:
+            signalArray = self.cameraController.getSignalsFromDSP()
+        signalArray = np.asarray(signalArray, dtype=float)
+        if not self.isTracking():
+            return self.startTrack(actualVolume, signalArray, timestamp)
+
+        dt = self.frameInterval
+        if timestamp is not None and self.lastTimestamp is not None:
+            dt = max(timestamp - self.lastTimestamp, 0)
+        self.lastTimestamp = timestamp
+        predicted = self.predict(dt)
+
+        #Only the microphones closest to the predicted position take part, they carry the strongest and most reliable readings
+        layout = self.cameraController.getLayout()
+        nearest = helpers.getNearestIndices(layout.positions, predicted, self.numMics)
+        volumes = signalArray[nearest]
+        if (volumes <= 0).any():
+            return self.startTrack(actualVolume, signalArray, timestamp)
+
+        centers = layout.positions[nearest]
+        distanceRatios = np.broadcast_to(self.cameraController.getSensitivities(), (layout.count,))[nearest]/volumes
+        strength = actualVolume
+        if actualVolume is None:
+            #Strength and distance trade off against each other over a small patch of microphones, so the strength is smoothed
+            #across frames and the position is then fitted at that strength
+            strength = helpers.refinePositionAndStrength(centers, distanceRatios, predicted, self.strength, TRACKING_ITERATIONS)[1]
+            strength = self.strength + STRENGTH_SMOOTHING*(strength - self.strength)
+        point, residual = helpers.refineMultilateration(centers, strength*distanceRatios, predicted, TRACKING_ITERATIONS)
+
+        #Lost the track, either the fit jumped or the refinement walked out of the room
+        threshold = max(RESIDUAL_JUMP_FACTOR*self.runningResidual, MIN_RESIDUAL_THRESHOLD)
+        if residual > threshold or not inRoomBounds(point, self.cameraController.room):
+            return self.startTrack(actualVolume, signalArray, timestamp)
+
+        self.trackedFrames += 1
+        instrumentation.count("trackedFrames")
+        self.strength = strength
+        self.runningResidual += RESIDUAL_SMOOTHING*(residual - self.runningResidual)
+        self.cameraController.signalStrength = strength
+        self.cameraController.residual = residual
+
+        position = self.correct(point)
+        return [round(float(position[0]), 2), round(float(position[1]), 2), round(float(position[2]), 2)]
+
+#Constant velocity state transition over dt seconds for an (x, y, z, vx, vy, vz) state
+def getTransitionMatrix(dt):
+    transition = np.eye(6)
+    transition[0:3, 3:6] = dt*np.eye(3)
+    return transition
+
+#Process covariance of a constant velocity model driven by white noise acceleration with the given standard deviation
+def getProcessCovariance(dt, processNoise):
+    block = processNoise*processNoise*np.array([[dt**4/4, dt**3/2], [dt**3/2, dt**2]])
+    return np.kron(block, np.eye(3))
+
+#Determine if a point lies inside the room, walls included
+def inRoomBounds(point, room):
+    return 0 <= point[0] <= room.x and 0 <= point[1] <= room.y and 0 <= point[2] <= room.z
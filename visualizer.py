@@ -1,5 +1,42 @@
+import time
+
 import matplotlib.pyplot as plt
 import numpy as np
+from mpl_toolkits.mplot3d.art3d import Line3DCollection, Poly3DCollection
+
+#Default number of steps around each microphone sphere in the live view, and the floor level of detail may reduce it to
+DEFAULT_SPHERE_RESOLUTION = 24
+MIN_SPHERE_RESOLUTION = 6
+
+#Number of spheres the live view can draw at full resolution, beyond this the resolution is reduced to keep the face count flat
+SPHERE_DETAIL_BUDGET = 16
+
+#Unit sphere meshes already computed, keyed by resolution
+unitSpheres = {}
+unitSphereFaces = {}
+
+#Return the unit sphere surface grid at a resolution, computing it only the first time
+def getUnitSphere(resolution):
+    if resolution not in unitSpheres:
+        u = np.linspace(0, 2 * np.pi, resolution)
+        v = np.linspace(0, np.pi, resolution)
+        unitSpheres[resolution] = np.array([np.outer(np.cos(u), np.sin(v)),
+                                            np.outer(np.sin(u), np.sin(v)),
+                                            np.outer(np.ones(np.size(u)), np.cos(v))])
+    return unitSpheres[resolution]
+
+#Return the unit sphere as an (F,4,3) array of quad faces, computing it only the first time
+def getUnitSphereFaces(resolution):
+    if resolution not in unitSphereFaces:
+        grid = np.moveaxis(getUnitSphere(resolution), 0, -1)
+        unitSphereFaces[resolution] = np.stack([grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]], axis=2).reshape(-1, 4, 3)
+    return unitSphereFaces[resolution]
+
+#Return the 12 edges of the room as an (12,2,3) array of line segments
+def getRoomEdges(room):
+    corners = np.array([[x, y, z] for x in (0, room.x) for y in (0, room.y) for z in (0, room.z)], dtype=float)
+    edges = [(a, b) for a in range(0, 8) for b in range(a + 1, 8) if np.count_nonzero(corners[a] != corners[b]) == 1]
+    return np.array([[corners[a], corners[b]] for a, b in edges])
 
 #Function to visualize the signal prediction
 def visualize(cameraController, actualVolume, signal):
@@ -18,8 +55,7 @@ def visualize(cameraController, actualVolume, signal):
     ax.set_ylim3d(-1, maxScale)
     ax.set_zlim3d(-1, maxScale)
 
-    u = np.linspace(0, 2 * np.pi, 100)
-    v = np.linspace(0, np.pi, 100)
+    unitSphere = getUnitSphere(100)
 
     #Generate sphere data from the microphones possible pickup pattern
     for x in range(0, activeMicCount):
@@ -29,9 +65,9 @@ def visualize(cameraController, actualVolume, signal):
         offSetZ = float(micPositions[x][2])
 
         # Make data
-        a = radius * np.outer(np.cos(u), np.sin(v)) + offSetX
-        b = radius * np.outer(np.sin(u), np.sin(v)) + offSetY
-        c = radius * np.outer(np.ones(np.size(u)), np.cos(v)) + offSetZ
+        a = radius * unitSphere[0] + offSetX
+        b = radius * unitSphere[1] + offSetY
+        c = radius * unitSphere[2] + offSetZ
 
         microphoneDisplays.append([a,b,c])
 
@@ -72,6 +108,100 @@ def visualize(cameraController, actualVolume, signal):
     ax.set_box_aspect([1,1,1])
     plt.show()
 
+#Class to represent a persistent visualization that keeps up with a stream of signal predictions
+#The room, microphones and camera are drawn once, each new fix only moves the predicted point, the camera ray, the microphone
+#rays and the batched microphone spheres
+class LiveVisualizer:
+    def __init__(self, cameraController, sphereResolution=DEFAULT_SPHERE_RESOLUTION, maxSpheres=None, showSpheres=True):
+        self.cameraController = cameraController
+        self.micPositions = np.asarray(cameraController.getMicPositions(), dtype=float)[0:cameraController.dsp.getNumActiveMics()]
+        self.cameraPosition = np.asarray(cameraController.position, dtype=float)
+        self.sphereResolution = sphereResolution
+        self.maxSpheres = maxSpheres
+        self.showSpheres = showSpheres
+
+        self.figure = plt.figure()
+        self.ax = self.figure.add_subplot(111, projection='3d')
+        room = cameraController.room
+        maxScale = max(room.x, room.y, room.z)
+        self.ax.set_xlim3d(-1, maxScale)
+        self.ax.set_ylim3d(-1, maxScale)
+        self.ax.set_zlim3d(-1, maxScale)
+        self.ax.set_box_aspect([1,1,1])
+
+        #Static artists, each drawn as a single collection
+        self.ax.add_collection3d(Line3DCollection(getRoomEdges(room), colors='m', linestyles=':', zorder=5))
+        self.ax.scatter(self.micPositions[:, 0], self.micPositions[:, 1], self.micPositions[:, 2], c='b', zorder=7)
+        self.ax.plot(self.cameraPosition[0], self.cameraPosition[1], self.cameraPosition[2], 'go', linewidth=2, markersize=12, zorder=9)
+
+        #Moving artists, updated in place on every fix
+        self.spheres = Poly3DCollection([], alpha=0.035, facecolor='b', zorder=4)
+        self.ax.add_collection3d(self.spheres)
+        self.micRays = Line3DCollection(np.stack([self.micPositions, self.micPositions], axis=1), colors='c', linestyles='--', linewidths=1, zorder=6)
+        self.ax.add_collection3d(self.micRays)
+        self.signalMarker = self.ax.plot([], [], [], 'r+', linewidth=6, markersize=10, zorder=10)[0]
+        self.cameraRay = self.ax.plot([], [], [], 'g--', linewidth=1, zorder=8)[0]
+
+    #Pick the sphere resolution for this many spheres, trading detail for face count on large arrays
+    def getSphereResolution(self, numSpheres):
+        if numSpheres <= SPHERE_DETAIL_BUDGET:
+            return self.sphereResolution
+        return max(MIN_SPHERE_RESOLUTION, int(self.sphereResolution * np.sqrt(SPHERE_DETAIL_BUDGET / numSpheres)))
+
+    #Move the dynamic artists to a new predicted signal location, the spheres are redrawn when distances are given
+    def update(self, predictedSignalLocation, distanceArray=None):
+        if not predictedSignalLocation:
+            return
+        signal = np.asarray(predictedSignalLocation, dtype=float)
+
+        self.signalMarker.set_data_3d([signal[0]], [signal[1]], [signal[2]])
+        self.cameraRay.set_data_3d([self.cameraPosition[0], signal[0]], [self.cameraPosition[1], signal[1]], [self.cameraPosition[2], signal[2]])
+        self.micRays.set_segments(np.stack([self.micPositions, np.broadcast_to(signal, self.micPositions.shape)], axis=1))
+
+        if self.showSpheres and distanceArray is not None:
+            radii = np.asarray(distanceArray, dtype=float)[0:len(self.micPositions)]
+            centers = self.micPositions
+
+            #Only the closest pickup spheres carry useful information when the array is large
+            if self.maxSpheres is not None and len(radii) > self.maxSpheres:
+                nearest = np.argsort(radii)[0:self.maxSpheres]
+                radii, centers = radii[nearest], centers[nearest]
+
+            unitFaces = getUnitSphereFaces(self.getSphereResolution(len(radii)))
+            faces = unitFaces[None] * radii[:, None, None, None] + centers[:, None, None, :]
+            self.spheres.set_verts(faces.reshape(-1, 4, 3))
+
+        self.figure.canvas.draw_idle()
+        self.figure.canvas.flush_events()
+
+    #Follow a stream of (position, heading) fixes such as signalStream.localizeStream, redrawing at most every interval seconds
+    #Fixes are taken as fast as the stream produces them and only the newest is drawn, so the view never falls behind the stream
+    #The spheres come from the DSP's current volumes at actualVolume, or at the strength of the last fix when it is None
+    def follow(self, fixes, interval=0.05, actualVolume=None):
+        plt.show(block=False)
+        latestFix = None
+        lastDraw = None
+        for predictedSignalLocation, heading in fixes:
+            if predictedSignalLocation:
+                latestFix = predictedSignalLocation
+            if latestFix is not None and (lastDraw is None or time.perf_counter() - lastDraw >= interval):
+                self.update(latestFix, self.getLiveDistances(actualVolume))
+                latestFix = None
+                lastDraw = time.perf_counter()
+        if latestFix is not None:
+            self.update(latestFix, self.getLiveDistances(actualVolume))
+
+    #Pickup sphere radii for the DSP's current volumes, or None when spheres are hidden or the volumes cannot give distances
+    def getLiveDistances(self, actualVolume=None):
+        if not self.showSpheres:
+            return None
+        if actualVolume is None:
+            actualVolume = self.cameraController.getSignalStrength()
+        signalArray = np.asarray(self.cameraController.getSignalsFromDSP(), dtype=float)[0:len(self.micPositions)]
+        if actualVolume is None or not (signalArray > 0).all():
+            return None
+        return self.cameraController.getSignalDistances(actualVolume, signalArray)
+
 #Draw a rectangular prism on the graph
 def rect_prism(ax, x_range, y_range, z_range):
     color = "m:"